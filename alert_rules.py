@@ -0,0 +1,126 @@
+import datetime, os
+from typing import Iterable
+from rainbird_data import RainbirdData
+from database_functions import POLL_INTERVAL_MIN
+from render_history_data import ZONE_ALIAS
+
+ZONE_COUNT = 8
+RULES = ("zone_started", "zone_stopped", "zone_runtime", "rain_sensor", "no_data")
+ALERT_RULES = os.getenv("ALERT_RULES", "zone_runtime,rain_sensor,no_data").split(",")
+ALERT_MAX_RUNTIME_MIN = float(os.getenv("ALERT_MAX_RUNTIME_MIN", "60"))
+# a little more than two poll intervals, so a single late poll is not reported
+ALERT_NO_DATA_MIN = float(
+    os.getenv("ALERT_NO_DATA_MIN") or max(15, 2.5 * POLL_INTERVAL_MIN)
+)
+if ALERT_NO_DATA_MIN <= POLL_INTERVAL_MIN:
+    raise ValueError(
+        f"ALERT_NO_DATA_MIN ({ALERT_NO_DATA_MIN:g}) must be longer than the poll "
+        f"interval ({POLL_INTERVAL_MIN:g} min)"
+    )
+
+
+def zone_name(zone: int) -> str:
+    if zone + 1 in ZONE_ALIAS:
+        return f"Zone {zone+1} ({ZONE_ALIAS[zone+1]})"
+    return f"Zone {zone+1}"
+
+
+class AlertEngine:
+    """Evaluates alert rules on every new sample as it is polled.
+
+    Only the last state of each zone, when it started and whether its runtime
+    was already reported is kept, so a sample costs the same no matter how
+    much history there is. The first sample only sets the state, a zone that
+    is already running when the bot starts is not reported as started.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[str] = ALERT_RULES,
+        max_runtime: datetime.timedelta = datetime.timedelta(
+            minutes=ALERT_MAX_RUNTIME_MIN
+        ),
+        max_silence: datetime.timedelta = datetime.timedelta(minutes=ALERT_NO_DATA_MIN),
+        zone_count: int = ZONE_COUNT,
+    ):
+        self.rules = {rule.strip() for rule in rules if rule.strip()}
+        unknown = self.rules - set(RULES)
+        if unknown:
+            raise ValueError(f"Unknown alert rules: {', '.join(sorted(unknown))}")
+
+        self.max_runtime = max_runtime
+        self.max_silence = max_silence
+        self.running: list[bool] = [False] * zone_count
+        # controller time at which the zone started, None if it is off
+        self.since: list[datetime.datetime | None] = [None] * zone_count
+        self.runtime_reported: list[bool] = [False] * zone_count
+        self.rain_sensor: bool | None = None
+        # local time the last sample arrived, the bot start until then
+        self.last_received = datetime.datetime.now()
+        self.silent = False
+
+    def process(
+        self, data: RainbirdData, received: datetime.datetime | None = None
+    ) -> list[str]:
+        """Update the state with a new sample and return the alerts it triggers."""
+        alerts = []
+        time = data.datetime
+        first = self.rain_sensor is None
+
+        self.last_received = received or datetime.datetime.now()
+        if self.silent:
+            self.silent = False
+            if "no_data" in self.rules:
+                alerts.append("Controller liefert wieder Daten")
+
+        if not first and data.rain_sensor != self.rain_sensor:
+            if "rain_sensor" in self.rules:
+                alerts.append(
+                    "Regensensor deaktiviert Bewässerung"
+                    if data.rain_sensor
+                    else "Regensensor aktiviert Bewässerung wieder"
+                )
+        self.rain_sensor = data.rain_sensor
+
+        for zone, zone_state in enumerate(data.zones[: len(self.running)]):
+            running = bool(zone_state)
+            if running and not self.running[zone]:
+                self.since[zone] = time
+                self.runtime_reported[zone] = False
+                if not first and "zone_started" in self.rules:
+                    blocked = " (Regensensor blockiert)" if data.rain_sensor else ""
+                    alerts.append(f"{zone_name(zone)} startet{blocked}")
+            elif not running and self.running[zone]:
+                if "zone_stopped" in self.rules:
+                    minutes = (time - self.since[zone]).total_seconds() / 60
+                    alerts.append(f"{zone_name(zone)} stoppt nach {minutes:.0f} min")
+                self.since[zone] = None
+            self.running[zone] = running
+
+            since = self.since[zone]
+            if (
+                since is not None
+                and not self.runtime_reported[zone]
+                and time - since >= self.max_runtime
+            ):
+                self.runtime_reported[zone] = True
+                if "zone_runtime" in self.rules:
+                    minutes = (time - since).total_seconds() / 60
+                    alerts.append(
+                        f"{zone_name(zone)} läuft seit {minutes:.0f} min, "
+                        "hängt das Ventil?"
+                    )
+
+        return alerts
+
+    def check_silence(self, now: datetime.datetime | None = None) -> list[str]:
+        """Alert once if no sample arrived for longer than max_silence."""
+        now = now or datetime.datetime.now()
+        if self.silent or now - self.last_received < self.max_silence:
+            return []
+
+        self.silent = True
+        if "no_data" not in self.rules:
+            return []
+        minutes = (now - self.last_received).total_seconds() / 60
+        return [f"Seit {minutes:.0f} min keine Daten vom Controller"]
@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the hot paths of the logger and the bot.
+
+Usage:
+    python benchmark.py [name ...]
+
+Runs all benchmarks if no name is given. Every benchmark works on a
+temporary database and never touches the real one.
+"""
+
+import asyncio, csv, datetime, json, os, random, statistics, sys, tempfile, time
+
+BENCHMARK_ROWS = int(os.getenv("BENCHMARK_ROWS", "1000000"))
+# set both to also measure sending the charts to a real chat
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+BENCHMARK_CHAT_ID = os.getenv("BENCHMARK_CHAT_ID")
+# mixed load for the latency benchmark: updates, arrivals per second and the
+# simulated round trip of a Bot API call and of one controller call
+BENCHMARK_UPDATES = int(os.getenv("BENCHMARK_UPDATES", "200"))
+BENCHMARK_UPDATE_RATE = float(os.getenv("BENCHMARK_UPDATE_RATE", "20"))
+API_DELAY = 0.03
+CONTROLLER_DELAY = 0.05
+# (share of the updates, command or button)
+UPDATE_MIX = [
+    (0.35, "/ping"),
+    (0.15, "/current"),
+    (0.15, "/today"),
+    (0.10, "/history day"),
+    (0.10, "/stats week"),
+    (0.15, "hist_today"),
+]
+
+
+def _sample_rows(count: int, start: datetime.datetime = datetime.datetime(2020, 1, 1)):
+    """Synthetic samples, one per minute, zone 1 runs from 6:00 to 6:30."""
+    for minute in range(count):
+        time = start + datetime.timedelta(minutes=minute)
+        zone_1 = time.hour == 6 and time.minute < 30
+        yield (time, zone_1, False, False, False, False, False, False, False, False)
+
+
+def _sample_data(start: datetime.datetime, days: int):
+    from rainbird_data import RainbirdData
+
+    return [
+        RainbirdData(row[0].date(), row[0].time(), row[1:9], row[9])
+        for row in _sample_rows(days * 24 * 60)
+        if row[0].minute % 5 == 0
+    ]
+
+
+def _write_csv(path: str, count: int) -> None:
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ["datetime"] + [f"zone_{zone}" for zone in range(1, 9)] + ["rain_sensor"]
+        )
+        for row in _sample_rows(count):
+            writer.writerow([row[0].isoformat(sep=" ")] + [int(v) for v in row[1:]])
+
+
+def benchmark_import() -> None:
+    """Bulk import of a CSV file compared to one add_data call per row."""
+    from database_functions import create_sqlite_database, add_data
+    from import_history import import_file
+    from rainbird_data import RainbirdData
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "history.csv")
+        _write_csv(csv_path, BENCHMARK_ROWS)
+
+        database = os.path.join(tmpdir, "bulk.sqlite3")
+        stats = import_file(database, csv_path)
+        print(
+            f"import_file: {stats.inserted} rows in {stats.seconds:.2f} s, "
+            f"{stats.rows_per_second:,.0f} rows/s"
+        )
+
+        stats = import_file(database, csv_path)
+        print(
+            f"import_file again (all duplicates): {stats.duplicates} rows in "
+            f"{stats.seconds:.2f} s, {stats.rows_per_second:,.0f} rows/s"
+        )
+
+        database = os.path.join(tmpdir, "single.sqlite3")
+        create_sqlite_database(database)
+        count = min(BENCHMARK_ROWS, 2000)
+        start = time.perf_counter()
+        for row in _sample_rows(count):
+            add_data(
+                database,
+                RainbirdData(row[0].date(), row[0].time(), row[1:9], row[9]),
+            )
+        seconds = time.perf_counter() - start
+        print(f"add_data per row: {count} rows, {count / seconds:,.0f} rows/s")
+
+
+async def _send_photos(paths: list[str]) -> list[float]:
+    from telegram import Bot
+
+    seconds = []
+    async with Bot(TELEGRAM_BOT_TOKEN) as bot:
+        for path in paths:
+            start = time.perf_counter()
+            with open(path, "rb") as file:
+                await bot.send_photo(chat_id=BENCHMARK_CHAT_ID, photo=file)
+            seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def benchmark_render_profiles() -> None:
+    """Image size, render + encode time and send time of every render profile."""
+    from render_history_data import (
+        RENDER_PROFILES,
+        render_history_data_day,
+        render_history_data_month,
+    )
+
+    day = _sample_data(datetime.datetime(2020, 1, 1), 1)
+    month = _sample_data(datetime.datetime(2020, 1, 1), 31)
+    # first render loads matplotlib and the fonts, don't count it
+    with tempfile.TemporaryDirectory() as tmpdir:
+        render_history_data_day(day, os.path.join(tmpdir, "warmup.png"))
+
+    for profile in RENDER_PROFILES:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for name, render, data in (
+                ("day", render_history_data_day, day),
+                ("month", render_history_data_month, month),
+            ):
+                path = os.path.join(tmpdir, f"{name}.png")
+                start = time.perf_counter()
+                render(data, path, 0, profile)
+                seconds = time.perf_counter() - start
+                paths.append(path)
+                print(
+                    f"{profile} {name}: {os.path.getsize(path) / 1024:.0f} KiB, "
+                    f"render + encode {seconds * 1000:.0f} ms"
+                )
+
+            if TELEGRAM_BOT_TOKEN and BENCHMARK_CHAT_ID:
+                for path, seconds in zip(paths, asyncio.run(_send_photos(paths))):
+                    print(
+                        f"{profile} {os.path.basename(path)}: send {seconds * 1000:.0f} ms"
+                    )
+            else:
+                print("send skipped, set TELEGRAM_BOT_TOKEN and BENCHMARK_CHAT_ID")
+
+
+def benchmark_chart_batch() -> None:
+    """The standard charts rendered one by one compared to one render_charts batch."""
+    from database_functions import add_data_bulk, create_sqlite_database, query_cache
+    from render_history_data import render_charts
+
+    charts = [("day", 0), ("day", -1), ("month", 0), ("month", -1)]
+    start = datetime.datetime.combine(
+        (datetime.date.today().replace(day=1) - datetime.timedelta(days=1)).replace(
+            day=1
+        ),
+        datetime.time(),
+    )
+    minutes = int((datetime.datetime.now() - start).total_seconds() // 60)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = os.path.join(tmpdir, "batch.sqlite3")
+        create_sqlite_database(database)
+        add_data_bulk(database, _sample_rows(minutes, start))
+        specs = [
+            (kind, offset, os.path.join(tmpdir, f"{kind}_{offset}.png"))
+            for kind, offset in charts
+        ]
+        # first render loads matplotlib and the fonts, don't count it
+        render_charts(database, specs[:1])
+
+        for profile in ("telegram", "archive"):
+            query_cache.clear()
+            begin = time.perf_counter()
+            for spec in specs:
+                render_charts(database, [spec], profile)
+            separate = time.perf_counter() - begin
+
+            query_cache.clear()
+            begin = time.perf_counter()
+            render_charts(database, specs, profile)
+            batch = time.perf_counter() - begin
+            print(
+                f"{profile} {len(specs)} charts: separate {separate * 1000:.0f} ms, "
+                f"batch {batch * 1000:.0f} ms"
+            )
+
+
+def _local_request(replies: dict[int, float]):
+    """Bot API stand-in that answers after API_DELAY and records reply times."""
+    from telegram.request import BaseRequest
+
+    class LocalRequest(BaseRequest):
+        async def initialize(self) -> None:
+            pass
+
+        async def shutdown(self) -> None:
+            pass
+
+        @property
+        def read_timeout(self) -> float | None:
+            return None
+
+        async def do_request(self, url, method, request_data=None, **kwargs):
+            await asyncio.sleep(API_DELAY)
+            parameters = request_data.parameters if request_data else {}
+            chat_id = parameters.get("chat_id")
+            endpoint = url.rsplit("/", 1)[-1]
+
+            if endpoint == "getMe":
+                result = {"id": 1, "is_bot": True, "first_name": "Benchmark"}
+                result["username"] = "benchmark_bot"
+            elif endpoint == "answerCallbackQuery":
+                result = True
+            else:
+                result = _message(0, int(chat_id or 0), "")
+                if endpoint == "sendPhoto":
+                    result["photo"] = [
+                        {"file_id": "f", "file_unique_id": "u", "width": 1, "height": 1}
+                    ]
+            if chat_id is not None:
+                replies[int(chat_id)] = time.perf_counter()
+            return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    return LocalRequest()
+
+
+def _message(message_id: int, chat_id: int, text: str) -> dict:
+    message = {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Benchmark"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [
+            {"type": "bot_command", "offset": 0, "length": len(command)}
+        ]
+    return message
+
+
+def _update(update_id: int, chat_id: int, action: str) -> dict:
+    if action.startswith("/"):
+        return {"update_id": update_id, "message": _message(1, chat_id, action)}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Benchmark"},
+            "chat_instance": str(chat_id),
+            "data": action,
+            "message": _message(1, chat_id, "Wähle eine Option:"),
+        },
+    }
+
+
+async def _handler_latencies(bot_main, concurrent_updates: int, count: int) -> list:
+    """Feed a mixed load through an Application, latency until the last reply."""
+    from telegram import Update
+    from telegram.ext import Application
+
+    replies: dict[int, float] = {}
+    application = (
+        Application.builder()
+        .token("0:benchmark")
+        .request(_local_request(replies))
+        .get_updates_request(_local_request(replies))
+        .concurrent_updates(concurrent_updates)
+        .build()
+    )
+    bot_main.add_handlers(application)
+    await application.initialize()
+    await application.start()
+
+    random.seed(0)
+    shares, actions = zip(*UPDATE_MIX)
+    arrivals = {}
+    for update_id in range(count):
+        # one chat per update, so every reply belongs to exactly one update
+        chat_id = 1000 + update_id
+        action = random.choices(actions, shares)[0]
+        arrivals[chat_id] = time.perf_counter()
+        await application.update_queue.put(
+            Update.de_json(_update(update_id, chat_id, action), application.bot)
+        )
+        await asyncio.sleep(1 / BENCHMARK_UPDATE_RATE)
+
+    await application.update_queue.join()
+    # waits for the handlers that run as tasks
+    await application.stop()
+    await application.shutdown()
+    return [replies[chat_id] - arrival for chat_id, arrival in arrivals.items()]
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[int(percent) - 1]
+
+
+def benchmark_latency() -> None:
+    """p50/p99 handler latency under mixed load, sequential and concurrent updates."""
+    tmpdir = tempfile.TemporaryDirectory()
+    cwd = os.getcwd()
+    os.chdir(tmpdir.name)
+    os.environ["DATABASE_PATH"] = "latency.sqlite3"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from pyrainbird import async_client
+    from soak import FakeController
+
+    FakeController.delay = CONTROLLER_DELAY
+    async_client.CreateController = FakeController
+    import logging
+    import main as bot_main
+    from database_functions import add_data_bulk
+
+    logging.getLogger().setLevel(logging.ERROR)
+    bot_main.init_database()
+    yesterday = datetime.datetime.combine(
+        datetime.date.today() - datetime.timedelta(days=1), datetime.time()
+    )
+    minutes = int((datetime.datetime.now() - yesterday).total_seconds() // 60)
+    add_data_bulk(bot_main.DATABASE_PATH, _sample_rows(minutes, yesterday))
+
+    async def run() -> None:
+        # the bot prerenders the charts and builds the zone index at startup
+        await bot_main.prerender_all_charts(None)
+        await bot_main.get_zone_index()
+        await _handler_latencies(bot_main, 64, 20)
+
+        for name, concurrent_updates in (("sequential", 1), ("concurrent", 64)):
+            rejected = bot_main.request_scheduler.rejected
+            latencies = await _handler_latencies(
+                bot_main, concurrent_updates, BENCHMARK_UPDATES
+            )
+            print(
+                f"{name}: {len(latencies)} updates at {BENCHMARK_UPDATE_RATE:.0f}/s, "
+                f"p50 {_percentile(latencies, 50) * 1000:.0f} ms, "
+                f"p99 {_percentile(latencies, 99) * 1000:.0f} ms, "
+                f"max {max(latencies) * 1000:.0f} ms, "
+                f"{bot_main.request_scheduler.rejected - rejected} busy"
+            )
+        await bot_main.close_controller(None)
+
+    try:
+        asyncio.run(run())
+    finally:
+        os.chdir(cwd)
+        tmpdir.cleanup()
+
+
+BENCHMARKS = {
+    "import": benchmark_import,
+    "render": benchmark_render_profiles,
+    "batch": benchmark_chart_batch,
+    "latency": benchmark_latency,
+}
+
+
+def main() -> None:
+    names = sys.argv[1:] or list(BENCHMARKS.keys())
+    for name in names:
+        if name not in BENCHMARKS:
+            raise SystemExit(
+                f"Unknown benchmark {name}, choose from {list(BENCHMARKS)}"
+            )
+        print(f"--- {name} ---")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
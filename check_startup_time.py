@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Startup time budget for the bot.
+
+Imports main.py in a fresh interpreter with `python -X importtime` and fails
+if the import takes longer than the budget or pulls in the rendering stack,
+which should only be loaded when the first chart is drawn.
+
+Usage:
+    python check_startup_time.py [budget_ms]
+"""
+
+import os, subprocess, sys, tempfile
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1000"))
+LAZY_MODULES = ("matplotlib", "numpy")
+
+
+def parse_importtime(output: str) -> dict[str, int]:
+    """Parse `-X importtime` output into {module: cumulative microseconds}."""
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # header line
+        times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def measure_import(module: str = "main") -> dict[str, int]:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ)
+        env["DATABASE_PATH"] = os.path.join(tmpdir, "startup.sqlite3")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            print(result.stderr)
+            raise SystemExit(f"Importing {module} failed")
+        if os.path.exists(env["DATABASE_PATH"]):
+            raise SystemExit(f"Importing {module} must not touch the database")
+
+    return parse_importtime(result.stderr)
+
+
+def eager_imports(times: dict[str, int]) -> list[str]:
+    """Modules in times that belong to LAZY_MODULES."""
+    return [
+        name
+        for name in times
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    ]
+
+
+def main() -> None:
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else STARTUP_BUDGET_MS
+    times = measure_import("main")
+
+    eager = eager_imports(times)
+    if eager:
+        raise SystemExit("Imported at startup but should be lazy: " + ", ".join(eager))
+
+    total_ms = times["main"] / 1000
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[1:6]
+    print(f"import main: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    for name, us in slowest:
+        print(f"    {name}: {us / 1000:.0f} ms")
+
+    if total_ms > budget_ms:
+        raise SystemExit(f"Startup time {total_ms:.0f} ms exceeds budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,203 @@
-import sqlite3, os
+import sqlite3, os, datetime, itertools, threading, uuid
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator
 from rainbird_data import RainbirdData
+from month_archive import open_archive
+from request_profiler import span, set_attribute
+
+QUERY_CACHE_MAX_ROWS = int(os.getenv("QUERY_CACHE_MAX_ROWS", "200000"))
+# minutes between two samples, the daemon's DATABASE_INTERVAL_SEC wins if set
+POLL_INTERVAL_MIN = (
+    float(os.environ["DATABASE_INTERVAL_SEC"]) / 60
+    if os.getenv("DATABASE_INTERVAL_SEC")
+    else float(os.getenv("DATABASE_INTERVAL_MIN") or "1")
+)
+# samples further apart than this are a gap in the data, e.g. a polling outage.
+# By default a little more than two poll intervals, so one missed poll is no gap
+MAX_SAMPLE_GAP_MIN = float(
+    os.getenv("MAX_SAMPLE_GAP_MIN") or max(15, 2.5 * POLL_INTERVAL_MIN)
+)
+if MAX_SAMPLE_GAP_MIN <= POLL_INTERVAL_MIN:
+    raise ValueError(
+        f"MAX_SAMPLE_GAP_MIN ({MAX_SAMPLE_GAP_MIN:g}) must be longer than the poll "
+        f"interval ({POLL_INTERVAL_MIN:g} min)"
+    )
+MAX_SAMPLE_GAP = datetime.timedelta(minutes=MAX_SAMPLE_GAP_MIN)
+# rows kept in data_changes, a reader that is further behind drops all its caches
+DATA_CHANGES_KEPT = 10000
+# file_ids kept in telegram_files, older uploads are uploaded again when needed
+TELEGRAM_FILES_KEPT = 1000
+
+
+class QueryCache:
+    """Results of range queries, keyed by (database, start, end).
+
+    Closed ranges (ending before now) never change and stay cached until the row
+    limit evicts the least recently used entry. Ranges that contain a newly
+    written timestamp are dropped by add_data, ranges written by other
+    processes, e.g. import_history.py or the daemon, by sync_changes.
+
+    Every invalidation bumps the generation. A reader takes the generation before
+    its query and passes it to put, so a result read before a concurrent write
+    is not stored after the write invalidated the cache.
+    """
+
+    def __init__(self, max_rows: int = QUERY_CACHE_MAX_ROWS):
+        self.max_rows = max_rows
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: OrderedDict[tuple, list[RainbirdData]] = OrderedDict()
+        # charts are rendered in worker threads
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> list[RainbirdData] | None:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return list(data)
+
+    def put(
+        self, key: tuple, data: list[RainbirdData], generation: int | None = None
+    ) -> None:
+        """Store data, unless the cache was invalidated since generation."""
+        if len(data) > self.max_rows:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self.rows -= len(self._entries.pop(key))
+            self._entries[key] = list(data)
+            self.rows += len(data)
+            while self.rows > self.max_rows:
+                _, evicted = self._entries.popitem(last=False)
+                self.rows -= len(evicted)
+
+    def invalidate(
+        self,
+        filepath: str,
+        first: datetime.datetime | None = None,
+        last: datetime.datetime | None = None,
+    ) -> None:
+        """Drop the entries of a database overlapping [first, last], all if no first.
+
+        last defaults to first, so a single time can be given.
+        """
+        last = last or first
+        with self._lock:
+            self.generation += 1
+            for key in list(self._entries.keys()):
+                if key[0] == filepath and (
+                    first is None or (key[1] <= last and first < key[2])
+                ):
+                    self.rows -= len(self._entries.pop(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.rows = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "rows": self.rows,
+            }
+
+
+query_cache = QueryCache()
+
+def data_version(filename: str) -> str:
+    """Changes with every write to the database by any process, e.g. for ETags."""
+    return str(sync_changes(filename))
+
+
+def _data_changed(filepath: str, time: datetime.datetime | None = None) -> None:
+    query_cache.invalidate(filepath, time)
+
+
+# Every write appends the range it touched to the data_changes table, tagged
+# with the writer. Readers apply the changes of other writers to their caches
+_WRITER = uuid.uuid4().hex
+_change_connections: dict[str, sqlite3.Connection] = {}
+_seen_versions: dict[str, int] = {}
+_change_listeners: list[
+    Callable[[str, datetime.datetime, datetime.datetime], None]
+] = []
+_changes_lock = threading.Lock()
+
+
+def _record_change(
+    c: sqlite3.Cursor, first: datetime.datetime, last: datetime.datetime
+) -> None:
+    c.execute(
+        "INSERT INTO data_changes (writer, first_sample, last_sample) VALUES (?, ?, ?)",
+        (_WRITER, first, last),
+    )
+    c.execute(
+        "DELETE FROM data_changes WHERE version <= ?",
+        (c.lastrowid - DATA_CHANGES_KEPT,),
+    )
+
+
+def on_external_change(
+    listener: Callable[[str, datetime.datetime, datetime.datetime], None]
+) -> None:
+    """Call listener(filepath, first, last) for ranges other processes wrote."""
+    _change_listeners.append(listener)
+
+
+def sync_changes(filename: str) -> int:
+    """Apply the writes of other processes to the caches, returns the version.
+
+    The version is the number of the last change, it grows with every write of
+    any process. A reader that fell behind the kept changes drops everything.
+    """
+    filepath = os.path.join(os.getcwd(), filename)
+    with _changes_lock:
+        seen = _seen_versions.get(filepath)
+        try:
+            conn = _change_connections.get(filepath)
+            if conn is None:
+                conn = sqlite3.connect(
+                    filepath,
+                    detect_types=sqlite3.PARSE_DECLTYPES,
+                    check_same_thread=False,
+                )
+                _change_connections[filepath] = conn
+            changes = conn.execute(
+                "SELECT version, writer, first_sample, last_sample FROM data_changes "
+                "WHERE version > ? ORDER BY version",
+                (seen or 0,),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print("sqlite3:", e)
+            return seen or 0
+
+        version = changes[-1][0] if changes else seen or 0
+        _seen_versions[filepath] = version
+        if seen is None:
+            # first look at this database, nothing was cached from it yet
+            return version
+
+        if changes and changes[0][0] > seen + 1:
+            changes = [(version, None, datetime.datetime.min, datetime.datetime.max)]
+        for _, writer, first, last in changes:
+            if writer == _WRITER:
+                continue
+            query_cache.invalidate(filepath, first, last)
+            for listener in _change_listeners:
+                listener(filepath, first, last)
+        return version
 
 
 def create_sqlite_database(filename):
@@ -26,6 +224,50 @@ def create_sqlite_database(filename):
             )
             """
         )
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS telegram_files (
+                content_hash TEXT PRIMARY KEY,
+                file_id TEXT
+            )
+            """
+        )
+        # the range every write touched, see sync_changes
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS data_changes (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                writer TEXT,
+                first_sample timestamp,
+                last_sample timestamp
+            )
+            """
+        )
+        # contiguous runs of samples, maintained on every write
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS coverage_spans (
+                first_sample timestamp PRIMARY KEY,
+                last_sample timestamp
+            )
+            """
+        )
+        c.execute(
+            """
+            CREATE INDEX IF NOT EXISTS coverage_spans_last_sample
+            ON coverage_spans (last_sample)
+            """
+        )
+        if c.execute("SELECT 1 FROM coverage_spans LIMIT 1").fetchone() is None:
+            rebuild_coverage(conn)
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS alert_subscriptions (
+                chat_id TEXT PRIMARY KEY,
+                enabled BOOLEAN
+            )
+            """
+        )
         conn.commit()
     except sqlite3.Error as e:
         print(e)
@@ -34,12 +276,22 @@ def create_sqlite_database(filename):
             conn.close()
 
 
-def add_data(filename: str, data: RainbirdData) -> None:
+def connect_database(filename: str) -> sqlite3.Connection:
+    """Open a connection that can be reused for many writes, e.g. by a daemon."""
+    filepath = os.path.join(os.getcwd(), filename)
+    return sqlite3.connect(filepath, detect_types=sqlite3.PARSE_DECLTYPES)
+
+
+def add_data(
+    filename: str, data: RainbirdData, connection: sqlite3.Connection | None = None
+) -> None:
+    """Insert one sample, using connection if given instead of opening a new one."""
     conn = None
     try:
         filepath = os.path.join(os.getcwd(), filename)
-        conn = sqlite3.connect(filepath, detect_types=sqlite3.PARSE_DECLTYPES)
-        c = conn.cursor()
+        if connection is None:
+            conn = sqlite3.connect(filepath, detect_types=sqlite3.PARSE_DECLTYPES)
+        c = (connection or conn).cursor()
         c.execute(
             """
             INSERT INTO rainbird_data (
@@ -63,7 +315,18 @@ def add_data(filename: str, data: RainbirdData) -> None:
                 data.rain_sensor,
             ),
         )
-        conn.commit()
+        (connection or conn).commit()
+        _data_changed(filepath, data.datetime)
+
+        # a failing coverage update must never cost the sample itself. Missing
+        # tables are created (and filled) by create_sqlite_database
+        try:
+            _cover(c, data.datetime)
+            _record_change(c, data.datetime, data.datetime)
+            (connection or conn).commit()
+        except sqlite3.Error as e:
+            print("sqlite3: coverage:", e)
+            (connection or conn).rollback()
 
     except sqlite3.Error as e:
         print("sqlite3:", e)
@@ -72,31 +335,153 @@ def add_data(filename: str, data: RainbirdData) -> None:
             conn.close()
 
 
-def line_to_rainbird_data(line: tuple) -> RainbirdData:
-    return RainbirdData(
-        date=line[0].date(),
-        time=line[0].time(),
-        zones_running=line[1:9],
-        rain_sensor=line[9],
+def add_data_bulk(
+    filename: str,
+    rows: Iterable[tuple],
+    batch_size: int = 50000,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Insert many (datetime, zone_1, ..., zone_8, rain_sensor) rows at once.
+
+    Rows whose datetime already exists are skipped. The import runs in large
+    transactions with bulk friendly pragmas, which are restored afterwards.
+    Returns the number of inserted rows.
+    """
+    conn = None
+    inserted = 0
+    try:
+        filepath = os.path.join(os.getcwd(), filename)
+        conn = sqlite3.connect(filepath, detect_types=sqlite3.PARSE_DECLTYPES)
+        c = conn.cursor()
+        synchronous = c.execute("PRAGMA synchronous").fetchone()[0]
+        journal_mode = c.execute("PRAGMA journal_mode").fetchone()[0]
+        c.execute("PRAGMA synchronous = OFF")
+        c.execute("PRAGMA journal_mode = MEMORY")
+        c.execute("PRAGMA cache_size = -65536")  # 64 MiB
+        c.execute("PRAGMA temp_store = MEMORY")
+
+        try:
+            read = 0
+            first = last = None
+            for batch in _batched(rows, batch_size):
+                changes = conn.total_changes
+                c.executemany(
+                    "INSERT OR IGNORE INTO rainbird_data VALUES ("
+                    + ", ".join("?" * 10)
+                    + ")",
+                    batch,
+                )
+                conn.commit()
+                inserted += conn.total_changes - changes
+                read += len(batch)
+                times = [row[0] for row in batch]
+                first = min(times) if first is None else min(first, *times)
+                last = max(times) if last is None else max(last, *times)
+                if progress is not None:
+                    progress(read)
+            if first is not None:
+                rebuild_coverage(conn, first, last)
+                _record_change(c, first, last)
+                conn.commit()
+        finally:
+            c.execute(f"PRAGMA journal_mode = {journal_mode}")
+            c.execute(f"PRAGMA synchronous = {synchronous}")
+            _data_changed(filepath)
+
+    except sqlite3.Error as e:
+        print("sqlite3:", e)
+    finally:
+        if conn:
+            conn.close()
+
+    return inserted
+
+
+def _cover(c: sqlite3.Cursor, time: datetime.datetime) -> None:
+    """Add one sample time to the coverage spans, merging the spans it connects."""
+    previous = c.execute(
+        "SELECT first_sample, last_sample FROM coverage_spans WHERE first_sample <= ? "
+        "ORDER BY first_sample DESC LIMIT 1",
+        (time,),
+    ).fetchone()
+    following = c.execute(
+        "SELECT first_sample, last_sample FROM coverage_spans WHERE first_sample > ? "
+        "ORDER BY first_sample LIMIT 1",
+        (time,),
+    ).fetchone()
+
+    first, last = time, time
+    if previous is not None and previous[1] >= time - MAX_SAMPLE_GAP:
+        first, last = previous[0], max(previous[1], time)
+    if following is not None and following[0] <= time + MAX_SAMPLE_GAP:
+        c.execute("DELETE FROM coverage_spans WHERE first_sample = ?", (following[0],))
+        last = max(last, following[1])
+    c.execute("INSERT OR REPLACE INTO coverage_spans VALUES (?, ?)", (first, last))
+
+
+def rebuild_coverage(
+    conn: sqlite3.Connection,
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+) -> None:
+    """Recompute the coverage spans between start and end, all if not given.
+
+    Spans reaching into the range are rebuilt as a whole. Used after bulk
+    imports, which would be slowed down a lot by updating them per row.
+    """
+    c = conn.cursor()
+    first, last = datetime.datetime.min, datetime.datetime.max
+    if start is not None and end is not None:
+        touching = c.execute(
+            "SELECT first_sample, last_sample FROM coverage_spans "
+            "WHERE last_sample >= ? AND first_sample <= ?",
+            (start - MAX_SAMPLE_GAP, end + MAX_SAMPLE_GAP),
+        ).fetchall()
+        first = min([start] + [span[0] for span in touching])
+        last = max([end] + [span[1] for span in touching])
+
+    spans = []
+    c.execute(
+        "SELECT datetime FROM rainbird_data WHERE datetime >= ? AND datetime <= ? "
+        "ORDER BY datetime",
+        (first, last),
     )
+    for (time,) in c:
+        if spans and time - spans[-1][1] <= MAX_SAMPLE_GAP:
+            spans[-1][1] = time
+        else:
+            spans.append([time, time])
 
+    c.execute(
+        "DELETE FROM coverage_spans WHERE first_sample >= ? AND first_sample <= ?",
+        (first, last),
+    )
+    c.executemany("INSERT INTO coverage_spans VALUES (?, ?)", spans)
 
-def get_data_from_day(filename: str, day_offset: int = 0) -> list[RainbirdData]:
+
+def get_gaps(
+    filename: str,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    now: datetime.datetime | None = None,
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """Periods longer than MAX_SAMPLE_GAP without samples in [start, end).
+
+    The range is cut off at now, the future is not missing any data.
+    """
+    end = min(end, now or datetime.datetime.now())
     conn = None
-    data = []
+    spans = []
     try:
         filepath = os.path.join(os.getcwd(), filename)
         conn = sqlite3.connect(filepath, detect_types=sqlite3.PARSE_DECLTYPES)
         c = conn.cursor()
         c.execute(
-            """
-            SELECT * FROM rainbird_data WHERE date(datetime) = date('now', ?)
-            """,
-            (f"{day_offset} day",),
+            "SELECT first_sample, last_sample FROM coverage_spans "
+            "WHERE last_sample >= ? AND first_sample < ? ORDER BY first_sample",
+            (start, end),
         )
-        data = c.fetchall()
-        if len(data) == 0:
-            print("No data available for this day.")
+        spans = c.fetchall()
 
     except sqlite3.Error as e:
         print("sqlite3:", e)
@@ -104,25 +489,225 @@ def get_data_from_day(filename: str, day_offset: int = 0) -> list[RainbirdData]:
         if conn:
             conn.close()
 
-    return [line_to_rainbird_data(line) for line in data]
+    gaps = []
+    covered_until = start
+    for first, last in spans:
+        if first - covered_until > MAX_SAMPLE_GAP:
+            gaps.append((covered_until, first))
+        covered_until = max(covered_until, last)
+    if end - covered_until > MAX_SAMPLE_GAP:
+        gaps.append((covered_until, end))
+    return gaps
 
 
-def get_data_from_month(filename: str, month_offset: int = 0) -> list[RainbirdData]:
+def coverage(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    gaps: list[tuple[datetime.datetime, datetime.datetime]],
+    now: datetime.datetime | None = None,
+) -> float:
+    """Share of [start, end) up to now that has samples."""
+    end = min(end, now or datetime.datetime.now())
+    if end <= start:
+        return 1.0
+    missing = sum(
+        (gap_end - gap_start for gap_start, gap_end in gaps), datetime.timedelta()
+    )
+    return 1 - missing / (end - start)
+
+
+def _batched(rows: Iterable[tuple], batch_size: int) -> Iterator[list[tuple]]:
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+
+
+def get_telegram_file_id(filename: str, content_hash: str) -> str | None:
+    """Telegram file_id of an already uploaded file with this content hash."""
     conn = None
-    data = []
+    row = None
     try:
         filepath = os.path.join(os.getcwd(), filename)
-        conn = sqlite3.connect(filepath, detect_types=sqlite3.PARSE_DECLTYPES)
+        conn = sqlite3.connect(filepath)
         c = conn.cursor()
         c.execute(
-            """
-            SELECT * FROM rainbird_data WHERE strftime('%m', datetime) = strftime('%m', 'now', ?)
-            """,
-            (f"{month_offset} month",),
+            "SELECT file_id FROM telegram_files WHERE content_hash = ?",
+            (content_hash,),
+        )
+        row = c.fetchone()
+
+    except sqlite3.Error as e:
+        print("sqlite3:", e)
+    finally:
+        if conn:
+            conn.close()
+
+    return row[0] if row else None
+
+
+def set_telegram_file_id(filename: str, content_hash: str, file_id: str | None) -> None:
+    """Remember the file_id of an uploaded file, or forget it if file_id is None.
+
+    Only the last TELEGRAM_FILES_KEPT uploads are kept.
+    """
+    conn = None
+    try:
+        filepath = os.path.join(os.getcwd(), filename)
+        conn = sqlite3.connect(filepath)
+        c = conn.cursor()
+        if file_id is None:
+            c.execute(
+                "DELETE FROM telegram_files WHERE content_hash = ?", (content_hash,)
+            )
+        else:
+            c.execute(
+                "INSERT OR REPLACE INTO telegram_files VALUES (?, ?)",
+                (content_hash, file_id),
+            )
+            # a replaced row gets a new rowid, so the rowid orders by upload
+            c.execute(
+                "DELETE FROM telegram_files WHERE rowid <= ?",
+                (c.lastrowid - TELEGRAM_FILES_KEPT,),
+            )
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print("sqlite3:", e)
+    finally:
+        if conn:
+            conn.close()
+
+
+def get_alert_subscriptions(filename: str) -> dict[str, bool]:
+    """Chats that turned alerts on or off with /alerts."""
+    conn = None
+    rows = []
+    try:
+        filepath = os.path.join(os.getcwd(), filename)
+        conn = sqlite3.connect(filepath)
+        c = conn.cursor()
+        c.execute("SELECT chat_id, enabled FROM alert_subscriptions")
+        rows = c.fetchall()
+
+    except sqlite3.Error as e:
+        print("sqlite3:", e)
+    finally:
+        if conn:
+            conn.close()
+
+    return {chat_id: bool(enabled) for chat_id, enabled in rows}
+
+
+def set_alert_subscription(filename: str, chat_id: str, enabled: bool) -> None:
+    conn = None
+    try:
+        filepath = os.path.join(os.getcwd(), filename)
+        conn = sqlite3.connect(filepath)
+        c = conn.cursor()
+        c.execute(
+            "INSERT OR REPLACE INTO alert_subscriptions VALUES (?, ?)",
+            (chat_id, enabled),
         )
-        data = c.fetchall()
-        if len(data) == 0:
-            print("No data available for this day.")
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print("sqlite3:", e)
+    finally:
+        if conn:
+            conn.close()
+
+
+def line_to_rainbird_data(line: tuple) -> RainbirdData:
+    return RainbirdData(
+        date=line[0].date(),
+        time=line[0].time(),
+        zones_running=line[1:9],
+        rain_sensor=line[9],
+    )
+
+
+def day_range(day_offset: int = 0) -> tuple[datetime.datetime, datetime.datetime]:
+    """Start and end of the day day_offset days from today."""
+    start = datetime.datetime.combine(
+        datetime.date.today() + datetime.timedelta(days=day_offset), datetime.time()
+    )
+    return start, start + datetime.timedelta(days=1)
+
+
+def month_range(
+    month_offset: int = 0,
+) -> tuple[datetime.datetime, datetime.datetime]:
+    """Start and end of the month month_offset months from the current one."""
+    today = datetime.date.today()
+    month_index = today.year * 12 + today.month - 1 + month_offset
+    start = datetime.datetime(month_index // 12, month_index % 12 + 1, 1)
+    end = datetime.datetime((month_index + 1) // 12, (month_index + 1) % 12 + 1, 1)
+    return start, end
+
+
+def get_data_from_day(filename: str, day_offset: int = 0) -> list[RainbirdData]:
+    data = get_data_between(filename, *day_range(day_offset))
+    if len(data) == 0:
+        print("No data available for this day.")
+    return data
+
+
+def get_data_from_month(filename: str, month_offset: int = 0) -> list[RainbirdData]:
+    data = get_data_between(filename, *month_range(month_offset))
+    if len(data) == 0:
+        print("No data available for this month.")
+    return data
+
+
+def get_data_between(
+    filename: str,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    cache: bool = True,
+) -> list[RainbirdData]:
+    """Get all entries with start <= datetime < end, ordered by time."""
+    filepath = os.path.join(os.getcwd(), filename)
+    key = (filepath, start, end)
+    if cache:
+        sync_changes(filename)
+        cached = query_cache.get(key)
+        if cached is not None:
+            set_attribute("query_cache_hit", True)
+            return cached
+    generation = query_cache.generation
+
+    # closed months are read from the memory-mapped archive, if there is one
+    archive = open_archive(filepath)
+    archived = []
+    if archive is not None and start < archive.until:
+        with span("archive read", start=start, end=min(end, archive.until)):
+            archived = archive.read(start, end)
+        if end <= archive.until:
+            if cache:
+                query_cache.put(key, archived, generation)
+            return archived
+        start = archive.until
+
+    conn = None
+    data = []
+    try:
+        conn = sqlite3.connect(filepath, detect_types=sqlite3.PARSE_DECLTYPES)
+        c = conn.cursor()
+        with span("sql select rainbird_data", start=start, end=end) as query_span:
+            c.execute(
+                """
+                SELECT * FROM rainbird_data WHERE datetime >= ? AND datetime < ?
+                ORDER BY datetime
+                """,
+                (start, end),
+            )
+            lines = c.fetchall()
+            if query_span is not None:
+                query_span.attributes["rows"] = len(lines)
+        with span("shape rows"):
+            data = archived + [line_to_rainbird_data(line) for line in lines]
+        if cache:
+            query_cache.put(key, data, generation)
 
     except sqlite3.Error as e:
         print("sqlite3:", e)
@@ -130,7 +715,7 @@ def get_data_from_month(filename: str, month_offset: int = 0) -> list[RainbirdDa
         if conn:
             conn.close()
 
-    return [line_to_rainbird_data(line) for line in data]
+    return data
 
 
 if __name__ == "__main__":
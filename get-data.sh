@@ -4,4 +4,4 @@
 source ./.venv/bin/activate
 
 # Run the main.py script
-python ./write_to_database.py
+python ./write_to_database.py "$@"
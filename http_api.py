@@ -0,0 +1,177 @@
+"""
+Read-only HTTP API for dashboards, served by the bot next to Telegram.
+
+    GET /api/current                        state of the latest poll
+    GET /api/history?start=&end=&format=    samples as rows (json) or columns
+    GET /api/stats?start=&end=              runtime statistics per zone
+
+start and end are ISO dates or times, by default today. Times with an offset
+are converted to the local time the samples are stored in. Every response has
+an ETag derived from the data version, which changes with every write of any
+process. A request with a matching If-None-Match gets a 304 after looking up
+only the latest change.
+Responses are gzipped if the client accepts it.
+"""
+
+import asyncio, datetime
+from typing import Awaitable, Callable
+from aiohttp import web
+from database_functions import coverage, data_version, get_data_between, get_gaps
+from rainbird_data import RainbirdData
+from zone_analytics import ZoneIntervalIndex
+
+MAX_HISTORY_DAYS = 366
+
+
+def _etag(database: str) -> str:
+    # weak, the gzipped and the plain response share it
+    return f'W/"{data_version(database)}"'
+
+
+def _not_modified(request: web.Request, etag: str) -> bool:
+    tags = request.headers.get("If-None-Match", "").split(",")
+    return etag in (tag.strip() for tag in tags)
+
+
+def _headers(etag: str) -> dict:
+    return {"ETag": etag, "Vary": "Accept-Encoding"}
+
+
+def _not_modified_response(etag: str) -> web.Response:
+    return web.Response(status=304, headers=_headers(etag))
+
+
+def _json(request: web.Request, data, etag: str) -> web.Response:
+    response = web.json_response(data, headers=_headers(etag))
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response.enable_compression(web.ContentCoding.gzip)
+    return response
+
+
+def _error(message: str, status: int = 400) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    time = datetime.datetime.fromisoformat(value)
+    if time.tzinfo is not None:
+        time = time.astimezone().replace(tzinfo=None)
+    return time
+
+
+def _parse_range(
+    request: web.Request,
+) -> tuple[datetime.datetime, datetime.datetime] | None:
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    try:
+        start = _parse_time(request.query.get("start", str(today)))
+        end = (
+            _parse_time(request.query["end"])
+            if "end" in request.query
+            else start + datetime.timedelta(days=1)
+        )
+    except (ValueError, OverflowError):
+        return None
+    if end <= start or end - start > datetime.timedelta(days=MAX_HISTORY_DAYS):
+        return None
+    return start, end
+
+
+def _sample(data: RainbirdData) -> dict:
+    return {
+        "time": data.datetime.isoformat(),
+        "zones": [bool(zone) for zone in data.zones],
+        "rain_sensor": bool(data.rain_sensor),
+    }
+
+
+def _columns(data: list[RainbirdData]) -> dict:
+    return {
+        "time": [entry.unixTimestamp for entry in data],
+        "zones": [
+            [int(zone) for zone in zones] for zones in zip(*(e.zones for e in data))
+        ],
+        "rain_sensor": [int(entry.rain_sensor) for entry in data],
+    }
+
+
+def create_app(
+    database: str,
+    current_state: Callable[[], RainbirdData | None],
+    zone_index: Callable[[], Awaitable[ZoneIntervalIndex]],
+) -> web.Application:
+    """HTTP API reading from database, the latest poll and the zone index."""
+
+    async def current(request: web.Request) -> web.Response:
+        etag = await asyncio.to_thread(_etag, database)
+        if _not_modified(request, etag):
+            return _not_modified_response(etag)
+        state = current_state()
+        if state is None:
+            return _error("no poll yet", 503)
+        return _json(request, _sample(state), etag)
+
+    async def history(request: web.Request) -> web.Response:
+        etag = await asyncio.to_thread(_etag, database)
+        if _not_modified(request, etag):
+            return _not_modified_response(etag)
+        time_range = _parse_range(request)
+        output = request.query.get("format", "json")
+        if time_range is None or output not in ("json", "columns"):
+            return _error(
+                f"use start and end as ISO times, at most {MAX_HISTORY_DAYS} days "
+                "apart, and format json or columns"
+            )
+
+        data = await asyncio.to_thread(get_data_between, database, *time_range)
+        if output == "columns":
+            return _json(request, _columns(data), etag)
+        return _json(request, [_sample(entry) for entry in data], etag)
+
+    async def stats(request: web.Request) -> web.Response:
+        etag = await asyncio.to_thread(_etag, database)
+        if _not_modified(request, etag):
+            return _not_modified_response(etag)
+        time_range = _parse_range(request)
+        if time_range is None:
+            return _error(
+                f"use start and end as ISO times, at most {MAX_HISTORY_DAYS} days apart"
+            )
+
+        index = await zone_index()
+        gaps = await asyncio.to_thread(get_gaps, database, *time_range)
+        zones = [
+            {
+                "zone": zone + 1,
+                "cycles": zone_stats.cycles,
+                "total_seconds": zone_stats.total.total_seconds(),
+                "average_seconds": zone_stats.average.total_seconds(),
+                "longest_seconds": zone_stats.longest.total_seconds(),
+            }
+            for zone, zone_stats in enumerate(index.zone_stats(*time_range))
+        ]
+        return _json(
+            request,
+            {
+                "start": time_range[0].isoformat(),
+                "end": time_range[1].isoformat(),
+                "coverage": coverage(*time_range, gaps),
+                "gaps": [[start.isoformat(), end.isoformat()] for start, end in gaps],
+                "zones": zones,
+            },
+            etag,
+        )
+
+    app = web.Application()
+    app.router.add_get("/api/current", current)
+    app.router.add_get("/api/history", history)
+    app.router.add_get("/api/stats", stats)
+    return app
+
+
+async def start_http_api(app: web.Application, host: str, port: int) -> web.AppRunner:
+    """Serve app on the running event loop, stop it with runner.cleanup()."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
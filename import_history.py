@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Import historical irrigation data from a CSV or JSONL file.
+
+The file is streamed, every row is validated and rows whose timestamp is
+already in the database are skipped. CSV files need a header, JSONL files one
+object per line, both with the keys:
+
+    datetime, zone_1 ... zone_8 (or zone1 ... zone8), rain_sensor
+
+JSONL objects may also contain a "zones" list instead of the single zones.
+The datetime is an ISO timestamp or unix seconds, missing zones are off.
+
+Usage:
+    python import_history.py <file.csv|file.jsonl> [database]
+"""
+
+import csv, datetime, json, os, sys, time
+from typing import IO, Callable, Iterator
+from dotenv import load_dotenv
+
+from database_functions import create_sqlite_database, add_data_bulk
+
+ZONE_COUNT = 8
+BOOLEANS = {
+    **{value: True for value in ("1", "true", "yes", "on", "t", "y")},
+    **{value: False for value in ("0", "false", "no", "off", "f", "n", "")},
+}
+# upper and title case spellings, so most values are found without normalizing
+BOOLEANS.update({value.upper(): BOOLEANS[value] for value in list(BOOLEANS)})
+BOOLEANS.update({value.title(): BOOLEANS[value] for value in list(BOOLEANS)})
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    if value is None:
+        return False
+    value = str(value).strip().lower()
+    if value not in BOOLEANS:
+        raise ValueError(f"Invalid boolean: {value}")
+    return BOOLEANS[value]
+
+
+def parse_datetime(value) -> datetime.datetime:
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value)
+    value = str(value).strip()
+    if value.replace(".", "", 1).isdigit():
+        return datetime.datetime.fromtimestamp(float(value))
+    timestamp = datetime.datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        # local wall-clock time, the same as for unix timestamps
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+def record_to_row(record: dict) -> tuple:
+    """Convert a JSON record into a rainbird_data row."""
+    timestamp = record.get("datetime", record.get("timestamp"))
+    if timestamp is None:
+        raise ValueError("Missing datetime")
+
+    if "zones" in record:
+        zones = [parse_bool(zone) for zone in record["zones"]][:ZONE_COUNT]
+        zones += [False] * (ZONE_COUNT - len(zones))
+    else:
+        zones = [
+            parse_bool(record.get(f"zone_{zone}", record.get(f"zone{zone}")))
+            for zone in range(1, ZONE_COUNT + 1)
+        ]
+
+    return (parse_datetime(timestamp), *zones, parse_bool(record.get("rain_sensor")))
+
+
+def _column(header: list[str], *names: str) -> int | None:
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def read_csv_rows(file: IO[str]) -> Iterator[tuple | Exception]:
+    """Yield rows, or the error for invalid lines, resolving the columns once."""
+    reader = csv.reader(file)
+    header = [name.strip().lower() for name in next(reader, [])]
+    time_column = _column(header, "datetime", "timestamp")
+    if time_column is None:
+        raise ValueError("CSV header has no datetime column")
+    bool_columns = [
+        _column(header, f"zone_{zone}", f"zone{zone}")
+        for zone in range(1, ZONE_COUNT + 1)
+    ] + [_column(header, "rain_sensor")]
+
+    for line in reader:
+        try:
+            values = ["" if column is None else line[column] for column in bool_columns]
+            yield (
+                parse_datetime(line[time_column]),
+                *[
+                    BOOLEANS[value] if value in BOOLEANS else parse_bool(value)
+                    for value in values
+                ],
+            )
+        except (ValueError, TypeError, OverflowError, IndexError) as e:
+            yield e
+
+
+def read_jsonl_rows(file: IO[str]) -> Iterator[tuple | Exception]:
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield record_to_row(json.loads(line))
+        except (ValueError, TypeError, OverflowError, AttributeError) as e:
+            yield e
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        self.inserted = 0
+        self.seconds = 0.0
+
+    @property
+    def duplicates(self) -> int:
+        return self.read - self.invalid - self.inserted
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.seconds if self.seconds > 0 else 0.0
+
+
+def valid_rows(path: str, stats: ImportStats) -> Iterator[tuple]:
+    with open(path, newline="") as file:
+        if path.endswith(".jsonl") or path.endswith(".ndjson"):
+            rows = read_jsonl_rows(file)
+        else:
+            rows = read_csv_rows(file)
+
+        for row in rows:
+            stats.read += 1
+            if isinstance(row, Exception):
+                stats.invalid += 1
+                print(f"Skipping row {stats.read}: {row}", file=sys.stderr)
+                continue
+            yield row
+
+
+def import_file(
+    database: str,
+    path: str,
+    batch_size: int = 50000,
+    progress: Callable[[ImportStats], None] | None = None,
+) -> ImportStats:
+    """Stream a CSV or JSONL file into the database."""
+    create_sqlite_database(database)
+    stats = ImportStats()
+    start = time.perf_counter()
+
+    def report(_: int) -> None:
+        stats.seconds = time.perf_counter() - start
+        if progress is not None:
+            progress(stats)
+
+    stats.inserted = add_data_bulk(
+        database, valid_rows(path, stats), batch_size, report
+    )
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def print_progress(stats: ImportStats) -> None:
+    print(
+        f"{stats.read} rows read, {stats.rows_per_second:.0f} rows/s",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    load_dotenv()
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+
+    database = sys.argv[2] if len(sys.argv) > 2 else os.getenv("DATABASE_PATH")
+    stats = import_file(database, sys.argv[1], progress=print_progress)
+    print(
+        f"Imported {stats.inserted} rows in {stats.seconds:.1f} s "
+        f"({stats.rows_per_second:.0f} rows/s), "
+        f"{stats.duplicates} duplicates and {stats.invalid} invalid rows skipped"
+    )
+
+
+if __name__ == "__main__":
+    main()
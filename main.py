@@ -1,22 +1,56 @@
 #!/usr/bin/env python
 
-import logging, aiohttp, os, datetime
+import logging, aiohttp, asyncio, hashlib, json, os, datetime, threading
 from dotenv import load_dotenv
+
+# the modules below read their settings from the environment when imported
+load_dotenv()
+
 import os
-from rainbird_data import get_rainbird_data
+from rainbird_data import RainbirdData, get_rainbird_data
 from pyrainbird import async_client
 from database_functions import (
     create_sqlite_database,
     add_data,
     get_data_from_day,
-    get_data_from_month,
+    get_gaps,
+    coverage,
+    day_range,
+    get_telegram_file_id,
+    set_telegram_file_id,
+    get_alert_subscriptions,
+    set_alert_subscription,
+    on_external_change,
+    sync_changes,
+    query_cache,
+)
+from render_history_data import render_charts, int_to_month
+from zone_analytics import (
+    ZoneIntervalIndex,
+    build_zone_index,
+    update_zone_index,
+    parse_stats_range,
+    zone_stats_string,
+)
+from alert_rules import AlertEngine
+from telegram_notification import TelegramNotifier
+from month_archive import archive_months
+from http_api import create_app, start_http_api
+from request_scheduler import RequestScheduler, BUSY
+from request_profiler import (
+    profile_handler,
+    settings as profiler_settings,
+    span,
+    span_tree_string,
 )
-from render_history_data import (
-    render_history_data_day,
-    render_history_data_month,
-    int_to_month,
+from memory_stats import (
+    TRACEMALLOC_FRAMES,
+    memory_snapshot,
+    memory_snapshot_string,
+    start_tracing,
 )
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -30,7 +64,6 @@ from telegram.ext import (
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
 )
-load_dotenv()
 LOGGER_LEVEL = os.getenv("LOGGER_LEVEL")
 
 if LOGGER_LEVEL == "DEBUG":
@@ -54,9 +87,19 @@ RAINBIRD_IP = os.getenv("RAINBIRD_IP_ADDRESS")
 
 DATABASE_PATH = os.getenv("DATABASE_PATH")
 DATABASE_INTERVAL_MIN = os.getenv("DATABASE_INTERVAL_MIN")
+RENDER_PROFILE = os.getenv("RENDER_PROFILE", "telegram")
+# updates handled at the same time, 1 handles them one after the other
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
+# port of the read-only HTTP API for dashboards, 0 turns it off. It has no
+# authentication, so it is only reachable from other hosts if HTTP_API_HOST says so
+HTTP_API_PORT = int(os.getenv("HTTP_API_PORT", "0"))
+HTTP_API_HOST = os.getenv("HTTP_API_HOST", "127.0.0.1")
+ARCHIVE_MONTHS = os.getenv("ARCHIVE_MONTHS", "0") == "1"
+ARCHIVE_PRUNE = os.getenv("ARCHIVE_PRUNE", "0") == "1"
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_IDS = os.getenv("TELEGRAM_CHAT_IDS")
+TELEGRAM_ADMIN_CHAT_IDS = os.getenv("TELEGRAM_ADMIN_CHAT_IDS", "").split(",")
 
 TELEGRAM_NOTIFICATION_TEXT = os.getenv("TELEGRAM_NOTIFICATION_TEXT")
 TELEGRAM_NOTIFICATION_TIME_HOUR = os.getenv("TELEGRAM_NOTIFICATION_TIME_HOUR")
@@ -84,12 +127,65 @@ HELP_STRING = """
     yesterday - Show a graph of yesterdays irrigation history
     month <opt:offset> - Show a graph of the months irrigation history
 
+/stats - Runtime, cycles, average and longest run per zone
+    today | yesterday | week
+    day <offset> | month <offset> | year <offset>
+    <YYYY-MM-DD> <opt:YYYY-MM-DD>
+
+/alerts on | off - Get alerts when zones run too long or the rain sensor changes
+
 You also get a notification if the rain sensor is deactivates irrigation at the specified time.
 """
 
-
-if not os.path.exists(DATABASE_PATH):
-    create_sqlite_database(DATABASE_PATH)
+CHART_DIR = "tmp/charts"
+# Charts served from disk instead of being rendered on every request
+PRERENDERED_CHARTS = [
+    ("day", 0),
+    ("day", -1),
+    ("month", 0),
+    ("month", -1),
+    ("month", -2),
+]
+HISTORY_BUTTONS = {
+    "hist_today": ("Heute", "day", 0),
+    "hist_yesterday": ("Gestern", "day", -1),
+    "hist_month_off_0": ("Dieser Monat", "month", 0),
+    "hist_month_off_1": ("Letzter Monat", "month", -1),
+    "hist_month_off_2": ("Vorletzter Monat", "month", -2),
+}
+
+# (kind, offset) -> (day the chart was rendered, filename)
+prerendered_charts: dict[tuple[str, int], tuple[datetime.date, str]] = {}
+# pyplot keeps global state, so only one chart is rendered at a time
+render_lock = asyncio.Lock()
+# charts and statistics are admitted through the scheduler, cheap commands are not
+request_scheduler = RequestScheduler(
+    max_running=int(os.getenv("MAX_CONCURRENT_REQUESTS", "2")),
+    max_waiting=int(os.getenv("MAX_QUEUED_REQUESTS", "8")),
+)
+BUSY_MESSAGE = "Gerade ausgelastet, bitte versuche es gleich noch einmal."
+# run intervals per zone, built on first use and updated on every poll
+zone_index: ZoneIntervalIndex | None = None
+zone_index_lock = asyncio.Lock()
+# earliest sample written by another process since the index was last updated,
+# set from the worker threads that read the database
+zone_index_changed_from: datetime.datetime | None = None
+zone_index_changes_lock = threading.Lock()
+# Updates are handled concurrently, so every shared resource has its own lock:
+# the controller answers one request at a time over one session, and all
+# database writes go through one writer so they never wait on each other
+controller_lock = asyncio.Lock()
+controller_session: aiohttp.ClientSession | None = None
+controller: async_client.AsyncRainbirdController | None = None
+database_lock = asyncio.Lock()
+# state of the latest poll, served by the HTTP API
+latest_sample: RainbirdData | None = None
+http_api_runner = None
+# evaluated on every poll, alerts go to the chats in alert_chats
+alert_engine = AlertEngine()
+alert_chats: set[str] = set()
+# rate limited sender for alerts, created when the first alert is sent
+notifier: TelegramNotifier | None = None
 
 
 def check_int(s):
@@ -99,6 +195,7 @@ def check_int(s):
 
 
 # Define command handlers. These usually take the two arguments update and context.
+@profile_handler
 async def ping(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Ping the bot."""
     logger.warning(
@@ -115,34 +212,75 @@ async def do_nothing(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     pass
 
 
+@profile_handler
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /help is issued."""
     logger.debug("Help command issued")
     await update.message.reply_text(HELP_STRING)
 
 
+async def poll_controller() -> RainbirdData:
+    """Read the current state through the shared controller connection."""
+    global controller_session, controller
+    async with controller_lock:
+        if controller is None:
+            controller_session = aiohttp.ClientSession()
+            controller = async_client.CreateController(
+                controller_session, RAINBIRD_IP, RAINBIRD_PASSWORD
+            )
+        return await get_rainbird_data(controller)
+
+
+async def close_controller(application: Application) -> None:
+    global controller_session, controller
+    async with controller_lock:
+        if controller_session is not None:
+            await controller_session.close()
+        controller_session = controller = None
+
+
+async def start_services(application: Application) -> None:
+    """Start the HTTP API next to the bot, if a port is set."""
+    global http_api_runner
+    if HTTP_API_PORT > 0:
+        app = create_app(DATABASE_PATH, lambda: latest_sample, get_zone_index)
+        http_api_runner = await start_http_api(app, HTTP_API_HOST, HTTP_API_PORT)
+        logger.info(f"HTTP API listening on {HTTP_API_HOST}:{HTTP_API_PORT}")
+
+
+async def stop_services(application: Application) -> None:
+    if http_api_runner is not None:
+        await http_api_runner.cleanup()
+    if notifier is not None:
+        await notifier.close()
+    await close_controller(application)
+
+
+async def write_database(function, *args) -> None:
+    """Run a database write in a worker thread, one write at a time."""
+    async with database_lock:
+        await asyncio.to_thread(function, *args)
+
+
 async def irrigation_current_string() -> str:
-    async with aiohttp.ClientSession() as session:
-        controller: async_client.AsyncRainbirdController = (
-            async_client.CreateController(session, RAINBIRD_IP, RAINBIRD_PASSWORD)
-        )
-        rainbird_data = await get_rainbird_data(controller)
+    rainbird_data = await poll_controller()
 
-        message = ""
-        if rainbird_data.rain_sensor:
-            message += "Regensensor deaktiviert Bewässerung\n"
-        else:
-            message += "Regensensor aktiviert Bewässerung\n"
+    message = ""
+    if rainbird_data.rain_sensor:
+        message += "Regensensor deaktiviert Bewässerung\n"
+    else:
+        message += "Regensensor aktiviert Bewässerung\n"
 
-        for index, zone in enumerate(rainbird_data.zones):
-            if zone:
-                message += f"Zone {index+1} läuft\n"
-            else:
-                message += f"Zone {index+1} läuft nicht\n"
+    for index, zone in enumerate(rainbird_data.zones):
+        if zone:
+            message += f"Zone {index+1} läuft\n"
+        else:
+            message += f"Zone {index+1} läuft nicht\n"
 
-        return message
+    return message
 
 
+@profile_handler
 async def check_irrigation_current(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
@@ -153,7 +291,9 @@ async def check_irrigation_current(
 
 
 async def irrigation_today_string() -> str:
-    data_parsed = get_data_from_day(DATABASE_PATH)
+    data_parsed = await asyncio.to_thread(get_data_from_day, DATABASE_PATH)
+    if len(data_parsed) == 0:
+        return "Keine Daten für heute\n"
     zones_today: list[bool] = [False] * 8
     for entry in data_parsed:
         for index, zone in enumerate(entry.zones):
@@ -167,9 +307,17 @@ async def irrigation_today_string() -> str:
         else:
             message += f"Zone {index+1} lief heute nicht\n"
 
+    start, end = day_range()
+    gaps = await asyncio.to_thread(get_gaps, DATABASE_PATH, start, end)
+    if len(gaps) > 0:
+        message += f"\nDaten für {coverage(start, end, gaps):.0%} des Tages, Lücken:\n"
+        for gap_start, gap_end in gaps:
+            message += f"{gap_start:%H:%M} - {gap_end:%H:%M}\n"
+
     return message
 
 
+@profile_handler
 async def check_irrigation_today(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
@@ -182,27 +330,183 @@ async def check_irrigation_today(
 async def rain_sensor_notification(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Check if irrigation is running."""
     logger.debug("Checking current irrigation status")
-    async with aiohttp.ClientSession() as session:
-        controller: async_client.AsyncRainbirdController = (
-            async_client.CreateController(session, RAINBIRD_IP, RAINBIRD_PASSWORD)
-        )
-        rainbird_data = await get_rainbird_data(controller)
+    rainbird_data = await poll_controller()
 
-        if telegram_available == True and rainbird_data.rain_sensor == True:
-            await context.bot.send_message(
-                context.job.chat_id, "Regensensor deaktiviert Bewässerung"
-            )
+    if telegram_available == True and rainbird_data.rain_sensor == True:
+        await context.bot.send_message(
+            context.job.chat_id, "Regensensor deaktiviert Bewässerung"
+        )
 
 
+@profile_handler
 async def save_data_to_db(context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.debug("Saving data to database")
-    async with aiohttp.ClientSession() as session:
-        controller: async_client.AsyncRainbirdController = (
-            async_client.CreateController(session, RAINBIRD_IP, RAINBIRD_PASSWORD)
+    global latest_sample
+    new_data = await poll_controller()
+    latest_sample = new_data
+    await write_database(add_data, DATABASE_PATH, new_data)
+
+    alerts = alert_engine.process(new_data)
+    async with zone_index_lock:
+        if zone_index is not None:
+            zone_index.add_sample(new_data)
+
+    # the alerts wait for the chats' rate limits, the charts do not wait for them
+    await asyncio.gather(
+        send_alerts(alerts), prerender_charts([("day", 0), ("month", 0)])
+    )
+
+
+async def send_alerts(alerts: list[str]) -> None:
+    """Send alerts to all subscribed chats at once, one message per chat."""
+    global notifier
+    if len(alerts) == 0 or len(alert_chats) == 0:
+        return
+
+    logger.info(f"Alerts: {alerts}")
+    if notifier is None:
+        notifier = TelegramNotifier(TOKEN)
+    chat_ids = sorted(alert_chats)
+    results = await notifier.broadcast("\n".join(alerts), chat_ids)
+    for chat_id, result in zip(chat_ids, results):
+        if isinstance(result, Exception) or not result.get("ok"):
+            logger.warning(f"Could not send alert to chat {chat_id}: {result}")
+
+
+async def check_data_silence(context: ContextTypes.DEFAULT_TYPE) -> None:
+    await send_alerts(alert_engine.check_silence())
+
+
+@profile_handler
+async def alerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Subscribe or unsubscribe this chat from alerts."""
+    chat_id = str(update.message.chat_id)
+    command = context.args[0] if len(context.args) > 0 else "status"
+    if command in ("on", "off"):
+        if command == "on":
+            alert_chats.add(chat_id)
+        else:
+            alert_chats.discard(chat_id)
+        await write_database(
+            set_alert_subscription, DATABASE_PATH, chat_id, command == "on"
+        )
+    elif command != "status":
+        await update.message.reply_text("Invalid command, use /alerts on | off")
+        return
+
+    if chat_id in alert_chats:
+        await update.message.reply_text(
+            "Alarme sind an: " + ", ".join(sorted(alert_engine.rules))
+        )
+    else:
+        await update.message.reply_text("Alarme sind aus")
+
+
+def render_chart_batch(charts: list[tuple[str, int, str]]) -> list[str | None]:
+    """Render (kind, offset, filename) charts from one query, None if without data."""
+    with span("render", charts=[f"{kind} {offset}" for kind, offset, _ in charts]):
+        return render_charts(DATABASE_PATH, charts, RENDER_PROFILE)
+
+
+async def render_chart_files(charts: list[tuple[str, int, str]]) -> list[bool]:
+    """Render charts in a worker thread and move them to their filenames when done.
+
+    The files are replaced atomically, a handler might still be sending the old
+    ones. Returns for every chart whether it was rendered or had no data.
+    """
+    tmp_charts = [
+        (
+            kind,
+            offset,
+            os.path.join(os.path.dirname(name), "." + os.path.basename(name)),
+        )
+        for kind, offset, name in charts
+    ]
+    async with render_lock:
+        rendered = await asyncio.to_thread(render_chart_batch, tmp_charts)
+        for (_, _, filename), tmp_filename in zip(charts, rendered):
+            if tmp_filename is not None:
+                os.replace(tmp_filename, filename)
+    return [tmp_filename is not None for tmp_filename in rendered]
+
+
+async def render_chart_file(kind: str, offset: int, filename: str) -> bool:
+    return (await render_chart_files([(kind, offset, filename)]))[0]
+
+
+async def prerender_charts(charts: list[tuple[str, int]]) -> None:
+    """Render charts in the background so the handlers can send them right away."""
+    os.makedirs(CHART_DIR, exist_ok=True)
+    filenames = [
+        os.path.join(CHART_DIR, f"{kind}_{offset}.png") for kind, offset in charts
+    ]
+    rendered = await render_chart_files(
+        [
+            (kind, offset, filename)
+            for (kind, offset), filename in zip(charts, filenames)
+        ]
+    )
+    for chart, filename, chart_rendered in zip(charts, filenames, rendered):
+        if chart_rendered:
+            prerendered_charts[chart] = (datetime.date.today(), filename)
+        else:
+            prerendered_charts.pop(chart, None)
+
+    logger.debug(f"Prerendered charts: {charts}")
+
+
+async def prerender_all_charts(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Render all standard charts, runs at startup and after midnight."""
+    await prerender_charts(PRERENDERED_CHARTS)
+    logger.info(f"Query cache: {query_cache.stats()}")
+
+
+async def archive_closed_months(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Move closed months to the columnar archive, runs at startup and daily."""
+    async with database_lock:
+        months = await asyncio.to_thread(
+            archive_months, DATABASE_PATH, prune=ARCHIVE_PRUNE
         )
+    if len(months) > 0:
+        logger.info(f"Archived months: {months}")
+
+
+async def get_chart(kind: str, offset: int) -> str | None:
+    """Return the filename of a chart, rendering it only if it is not prerendered."""
+    prerendered = prerendered_charts.get((kind, offset))
+    if prerendered is not None and prerendered[0] == datetime.date.today():
+        return prerendered[1]
+
+    os.makedirs("tmp", exist_ok=True)
+    filename = f"tmp/img_{kind}_{offset}.png"
+    return filename if await render_chart_file(kind, offset, filename) else None
+
+
+async def send_chart(bot: Bot, chat_id: int, chart: str) -> None:
+    """Send a chart, reusing the file_id if the same image was uploaded before."""
+    with open(chart, "rb") as file:
+        content = file.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    file_id = await asyncio.to_thread(get_telegram_file_id, DATABASE_PATH, content_hash)
+    if file_id is not None:
+        try:
+            with span("send by file_id"):
+                await bot.send_photo(chat_id=chat_id, photo=file_id)
+            return
+        except BadRequest as e:
+            logger.warning(f"Stored file_id not accepted, uploading again: {e}")
+            await write_database(
+                set_telegram_file_id, DATABASE_PATH, content_hash, None
+            )
 
-        new_data = await get_rainbird_data(controller)
-        add_data(DATABASE_PATH, new_data)
+    with span("upload", bytes=len(content)):
+        message = await bot.send_photo(
+            chat_id=chat_id, photo=content, filename=os.path.basename(chart)
+        )
+    await write_database(
+        set_telegram_file_id, DATABASE_PATH, content_hash, message.photo[-1].file_id
+    )
 
 
 async def send_image(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -211,6 +515,7 @@ async def send_image(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     await update.message.reply_photo(photo="https://telegram.org/img/t_logo.png")
 
 
+@profile_handler
 async def send_history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send an image of the days history."""
     command = context.args[0]
@@ -222,40 +527,150 @@ async def send_history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             await update.message.reply_text("Invalid day offset: " + day_offset)
             return
 
-        day_offset = int(day_offset)
-
-        render_history_data_day(
-            get_data_from_day(DATABASE_PATH, day_offset),
-            "tmp/img.png",
-            day_offset,
-        )
+        kind, offset = "day", int(day_offset)
     elif command == "yesterday":
-        render_history_data_day(
-            get_data_from_day(DATABASE_PATH, day_offset=-1),
-            "tmp/img.png",
-            -1,
-        )
+        kind, offset = "day", -1
     elif command == "month":
         month_offset = context.args[1] if len(context.args) > 1 else "0"
         if not check_int(month_offset):
             await update.message.reply_text("Invalid month offset: " + month_offset)
             return
 
-        month_offset = int(month_offset)
-
-        render_history_data_month(
-            get_data_from_month(DATABASE_PATH, month_offset),
-            "tmp/img.png",
-            month_offset,
-        )
+        kind, offset = "month", int(month_offset)
     else:
         await update.message.reply_text(
             "Invalid command, use /history day <opt:offset> | yesterday | month <opt:offset>"
         )
         return
-    await update.message.reply_photo(photo="tmp/img.png")
+
+    async def reply_chart() -> None:
+        chart = await get_chart(kind, offset)
+        if chart is None:
+            await update.message.reply_text("Keine Daten verfügbar")
+            return
+        await send_chart(context.bot, update.message.chat_id, chart)
+
+    status = await request_scheduler.run(
+        (update.message.chat_id, kind, offset), reply_chart
+    )
+    if status == BUSY:
+        await update.message.reply_text(BUSY_MESSAGE)
+
+
+def zone_index_external_change(
+    filepath: str, first: datetime.datetime, last: datetime.datetime
+) -> None:
+    global zone_index_changed_from
+    if filepath != os.path.join(os.getcwd(), DATABASE_PATH):
+        return
+    with zone_index_changes_lock:
+        if zone_index_changed_from is None or first < zone_index_changed_from:
+            zone_index_changed_from = first
+
+
+async def get_zone_index() -> ZoneIntervalIndex:
+    global zone_index, zone_index_changed_from
+    await asyncio.to_thread(sync_changes, DATABASE_PATH)
+    async with zone_index_lock:
+        with zone_index_changes_lock:
+            changed_from, zone_index_changed_from = zone_index_changed_from, None
+        if zone_index is None:
+            zone_index = await asyncio.to_thread(build_zone_index, DATABASE_PATH)
+        elif changed_from is not None:
+            zone_index = await asyncio.to_thread(
+                update_zone_index, zone_index, DATABASE_PATH, changed_from
+            )
+        return zone_index
 
 
+@profile_handler
+async def send_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Send runtime statistics per zone for a range of days."""
+    logger.debug("Sending stats with args: " + str(context.args))
+    stats_range = parse_stats_range(context.args, datetime.date.today())
+    if stats_range is None:
+        await update.message.reply_text(
+            "Invalid range, use /stats today | yesterday | week | day <offset> | "
+            "month <offset> | year <offset> | <YYYY-MM-DD> <opt:YYYY-MM-DD>"
+        )
+        return
+
+    async def reply_stats() -> None:
+        index = await get_zone_index()
+        start, end, _ = stats_range
+        gaps = await asyncio.to_thread(get_gaps, DATABASE_PATH, start, end)
+        await update.message.reply_text(
+            zone_stats_string(index, *stats_range, coverage(start, end, gaps))
+        )
+
+    status = await request_scheduler.run(
+        (update.message.chat_id, "stats", stats_range[0], stats_range[1]),
+        reply_stats,
+    )
+    if status == BUSY:
+        await update.message.reply_text(BUSY_MESSAGE)
+
+
+def is_admin(chat_id: int) -> bool:
+    return str(chat_id) in TELEGRAM_ADMIN_CHAT_IDS
+
+
+@profile_handler
+async def send_memory(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Send RSS and the top allocators, admins only."""
+    if not is_admin(update.message.chat_id):
+        logger.warning(f"/memory denied for chat {update.message.chat_id}")
+        return
+
+    snapshot = memory_snapshot()
+    message = memory_snapshot_string(snapshot)
+    if not snapshot["tracing"]:
+        start_tracing()
+        message += "tracemalloc started, allocations are traced from now on\n"
+    await update.message.reply_text(message)
+
+
+@profile_handler
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Toggle request profiling or show the last slow request, admins only."""
+    if not is_admin(update.message.chat_id):
+        logger.warning(f"/profile denied for chat {update.message.chat_id}")
+        return
+
+    command = context.args[0] if len(context.args) > 0 else "status"
+    if command in ("on", "off"):
+        profiler_settings.enabled = command == "on"
+    elif command == "cprofile":
+        profiler_settings.cprofile = not profiler_settings.cprofile
+    elif command == "slow" and len(context.args) > 1 and check_int(context.args[1]):
+        profiler_settings.slow_ms = float(context.args[1])
+    elif command != "status":
+        await update.message.reply_text(
+            "Invalid command, use /profile on | off | cprofile | slow <ms> | status"
+        )
+        return
+
+    message = (
+        f"Profiling: {'on' if profiler_settings.enabled else 'off'}, "
+        f"cProfile: {'on' if profiler_settings.cprofile else 'off'}, "
+        f"slow: {profiler_settings.slow_ms:.0f} ms\n"
+    )
+    if profiler_settings.last_dump is not None:
+        try:
+            with open(profiler_settings.last_dump) as file:
+                last = json.load(file)
+            message += f"\nLast slow request ({profiler_settings.last_dump}):\n"
+            message += span_tree_string(last)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read the last profile dump: {e}")
+            message += (
+                f"\nLast slow request ({profiler_settings.last_dump}) "
+                "is missing or unreadable"
+            )
+    await update.message.reply_text(message[:4096])
+
+
+@profile_handler
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Sends a message with three inline buttons attached."""
     keyboard = [
@@ -272,6 +687,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await update.message.reply_text("Hi! Wähle eine Option:", reply_markup=reply_markup)
 
 
+@profile_handler
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Parses the CallbackQuery and updates the message text."""
     query = update.callback_query
@@ -330,49 +746,28 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     elif query.data == "help":
         await query.edit_message_text(HELP_STRING, reply_markup=back_button_keyboard)
 
-    elif query.data == "hist_today":
-        render_history_data_day(
-            get_data_from_day(DATABASE_PATH),
-            "tmp/img.png",
-        )
-        await query.edit_message_text("Heute", reply_markup=back_button_keyboard)
-        # await query.edit_message_media("tmp/img.png")
-        await context.bot.send_photo(photo="tmp/img.png", chat_id=query.message.chat_id)
-
-    elif query.data == "hist_yesterday":
-        render_history_data_day(
-            get_data_from_day(DATABASE_PATH, day_offset=-1),
-            "tmp/img.png",
-            -1,
-        )
-        await query.edit_message_text("Gestern", reply_markup=back_button_keyboard)
-        await context.bot.send_photo(photo="tmp/img.png", chat_id=query.message.chat_id)
+    elif query.data in HISTORY_BUTTONS:
+        title, kind, offset = HISTORY_BUTTONS[query.data]
 
-    elif query.data == "hist_month_off_0":
-        render_history_data_month(
-            get_data_from_month(DATABASE_PATH),
-            "tmp/img.png",
-        )
-        await query.edit_message_text("Dieser Monat", reply_markup=back_button_keyboard)
-        await context.bot.send_photo(photo="tmp/img.png", chat_id=query.message.chat_id)
+        async def reply_chart() -> None:
+            chart = await get_chart(kind, offset)
+            if chart is None:
+                await query.edit_message_text(
+                    title + ": Keine Daten verfügbar",
+                    reply_markup=back_button_keyboard,
+                )
+                return
 
-    elif query.data == "hist_month_off_1":
-        render_history_data_month(
-            get_data_from_month(DATABASE_PATH, -1), "tmp/img.png", -1
-        )
-        await query.edit_message_text(
-            "Letzter Monat", reply_markup=back_button_keyboard
-        )
-        await context.bot.send_photo(photo="tmp/img.png", chat_id=query.message.chat_id)
+            await query.edit_message_text(title, reply_markup=back_button_keyboard)
+            await send_chart(context.bot, query.message.chat_id, chart)
 
-    elif query.data == "hist_month_off_2":
-        render_history_data_month(
-            get_data_from_month(DATABASE_PATH, -2), "tmp/img.png", -2
-        )
-        await query.edit_message_text(
-            "Vorletzter Monat", reply_markup=back_button_keyboard
+        status = await request_scheduler.run(
+            (query.message.chat_id, kind, offset), reply_chart
         )
-        await context.bot.send_photo(photo="tmp/img.png", chat_id=query.message.chat_id)
+        if status == BUSY:
+            await query.edit_message_text(
+                BUSY_MESSAGE, reply_markup=back_button_keyboard
+            )
 
     elif query.data == "nothing":
         pass
@@ -382,19 +777,64 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # await query.edit_message_text(text=f"Selected option: {query.data}")
 
 
-def main() -> None:
-    """Start the bot."""
-    # Create the Application and pass it your bot's token.
-    application = Application.builder().token(TOKEN).build()
+def init_database() -> None:
+    """Create the database schema, runs once when the bot starts."""
+    create_sqlite_database(DATABASE_PATH)
+    on_external_change(zone_index_external_change)
+
+    # the notification chats get alerts unless they turned them off
+    alert_chats.update(TELEGRAM_CHAT_IDS.split(",") if TELEGRAM_CHAT_IDS else [])
+    for chat_id, enabled in get_alert_subscriptions(DATABASE_PATH).items():
+        if enabled:
+            alert_chats.add(chat_id)
+        else:
+            alert_chats.discard(chat_id)
+
+
+def job_timezone() -> datetime.tzinfo:
+    """Timezone of the daily jobs, PTB would run them in UTC otherwise."""
+    if TELEGRAM_NOTIFICATION_TIMEZONE_OFFSET is not None:
+        return datetime.timezone(
+            datetime.timedelta(hours=int(TELEGRAM_NOTIFICATION_TIMEZONE_OFFSET))
+        )
+    return datetime.datetime.now().astimezone().tzinfo
+
 
+def add_handlers(application: Application) -> None:
+    """Register the command, button and message handlers."""
     # add different commands - answer in Telegram
     application.add_handler(CommandHandler("start", start))
-    application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(CallbackQueryHandler(button_handler, block=False))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("ping", ping))
     application.add_handler(CommandHandler("current", check_irrigation_current))
     application.add_handler(CommandHandler("today", check_irrigation_today))
-    application.add_handler(CommandHandler("history", send_history))
+    application.add_handler(CommandHandler("history", send_history, block=False))
+    application.add_handler(CommandHandler("stats", send_stats, block=False))
+    application.add_handler(CommandHandler("memory", send_memory))
+    application.add_handler(CommandHandler("profile", profile_command))
+    application.add_handler(CommandHandler("alerts", alerts_command))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, do_nothing))
+
+
+def main() -> None:
+    """Start the bot."""
+    init_database()
+    if TRACEMALLOC_FRAMES > 0:
+        start_tracing(TRACEMALLOC_FRAMES)
+
+    # Create the Application and pass it your bot's token.
+    # Updates are handled concurrently, a slow chart or controller call in one
+    # chat does not hold up the others
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(start_services)
+        .post_shutdown(stop_services)
+        .build()
+    )
+    add_handlers(application)
 
     # Add daily timer for rain sensor notification
     for index, chat_id in enumerate(TELEGRAM_CHAT_IDS.split(",")):
@@ -408,9 +848,7 @@ def main() -> None:
             hour=int(TELEGRAM_NOTIFICATION_TIME_HOUR),
             minute=int(TELEGRAM_NOTIFICATION_TIME_MINUTE),
             second=index * 10,  # Add a delay to avoid overwhelming the rainbird
-            tzinfo=datetime.timezone(
-                datetime.timedelta(hours=int(TELEGRAM_NOTIFICATION_TIMEZONE_OFFSET))
-            ),
+            tzinfo=job_timezone(),
         )
 
         application.job_queue.run_daily(
@@ -429,7 +867,24 @@ def main() -> None:
         save_data_to_db, float(DATABASE_INTERVAL_MIN) * 60, name="data_save"
     )
 
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, do_nothing))
+    # Alert if the polls stop delivering data
+    application.job_queue.run_repeating(check_data_silence, 60, name="data_silence")
+
+    if ARCHIVE_MONTHS:
+        application.job_queue.run_once(archive_closed_months, 0, name="archive")
+        application.job_queue.run_daily(
+            archive_closed_months,
+            datetime.time(minute=5, tzinfo=job_timezone()),
+            name="archive",
+        )
+
+    # Prerender the standard charts now and again after the day changed
+    application.job_queue.run_once(prerender_all_charts, 0, name="prerender")
+    application.job_queue.run_daily(
+        prerender_all_charts,
+        datetime.time(minute=0, second=30, tzinfo=job_timezone()),
+        name="prerender",
+    )
 
     # Run the bot until the user presses Ctrl-C
     logger.info("Starting bot")
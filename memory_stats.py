@@ -0,0 +1,56 @@
+import os, resource, tracemalloc
+
+# number of stack frames tracemalloc keeps per allocation, 0 disables tracing
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "0"))
+
+
+def start_tracing(frames: int = 1) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # no procfs, fall back to the peak size (kilobytes on linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def memory_snapshot(top: int = 10) -> dict:
+    """RSS, traced memory and the top allocating source lines."""
+    snapshot = {
+        "rss": rss_bytes(),
+        "tracing": tracemalloc.is_tracing(),
+        "traced": 0,
+        "traced_peak": 0,
+        "top": [],
+    }
+    if not tracemalloc.is_tracing():
+        return snapshot
+
+    snapshot["traced"], snapshot["traced_peak"] = tracemalloc.get_traced_memory()
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    snapshot["top"] = [
+        (str(statistic.traceback[0]), statistic.size, statistic.count)
+        for statistic in statistics[:top]
+    ]
+    return snapshot
+
+
+def memory_snapshot_string(snapshot: dict) -> str:
+    mib = 1024 * 1024
+    message = f"RSS: {snapshot['rss'] / mib:.1f} MiB\n"
+    if not snapshot["tracing"]:
+        return message + "tracemalloc is not running\n"
+
+    message += (
+        f"Traced: {snapshot['traced'] / mib:.1f} MiB "
+        f"(peak {snapshot['traced_peak'] / mib:.1f} MiB)\n\n"
+        "Top allocations:\n"
+    )
+    for location, size, count in snapshot["top"]:
+        message += f"{size / 1024:.0f} KiB in {count} blocks - {location}\n"
+    return message
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""
+Columnar archive of closed months.
+
+Past months never change, so they are written once to one .npy file per month
+with a timestamp column and a 16 bit state column (bit n set while zone n+1
+runs, bit 8 for the rain sensor). index.json records which months were
+archived and up to when the archive is complete. Readers memory-map the files,
+so a month is read without parsing anything, and get_data_between only asks
+SQLite for the time after the archive.
+
+Rows written into an archived month afterwards, e.g. by import_history.py,
+are not visible until the month is archived again with --rebuild, or until
+the next run with --prune, which merges them in before deleting them.
+
+Usage:
+    python month_archive.py [database] [--prune] [--rebuild]
+
+With --prune the archived rows are deleted from the database.
+"""
+
+import datetime, itertools, json, os, sqlite3, sys, threading
+from rainbird_data import RainbirdData
+
+ZONE_COUNT = 8
+RAIN_SENSOR_BIT = 1 << ZONE_COUNT
+INDEX_FILE = "index.json"
+
+
+def _numpy():
+    """Import numpy on first use, the bot does not need it to start."""
+    import numpy
+
+    return numpy
+
+
+def archive_dir(filepath: str) -> str:
+    """Archive directory of a database, next to the database file."""
+    return os.path.splitext(filepath)[0] + "_archive"
+
+
+def _month_key(time: datetime.datetime) -> str:
+    return f"{time.year:04d}-{time.month:02d}"
+
+
+def _next_month(time: datetime.datetime) -> datetime.datetime:
+    month_index = time.year * 12 + time.month
+    return datetime.datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+# state -> (zones, rain sensor), so converting a row is a single lookup
+_STATES = [
+    (
+        tuple(bool(state & (1 << zone)) for zone in range(ZONE_COUNT)),
+        bool(state & RAIN_SENSOR_BIT),
+    )
+    for state in range(1 << (ZONE_COUNT + 1))
+]
+
+
+class MonthArchive:
+    """Memory-mapped view of the archived months of one database."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE)) as file:
+            index = json.load(file)
+        self.until = datetime.datetime.fromisoformat(index["until"])
+        self.months: dict[str, dict] = index["months"]
+        self._columns: dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def month_columns(self, month: str):
+        """(times, states) of an archived month, None if it has no data."""
+        if month not in self.months:
+            return None
+        with self._lock:
+            if month not in self._columns:
+                array = _numpy().load(
+                    os.path.join(self.directory, self.months[month]["file"]),
+                    mmap_mode="r",
+                )
+                self._columns[month] = (array["time"], array["state"])
+            return self._columns[month]
+
+    def columns(self, start: datetime.datetime, end: datetime.datetime) -> list:
+        """(times, states) slices of every archived month in [start, end).
+
+        The slices are views of the memory-mapped files, nothing is copied.
+        """
+        np = _numpy()
+        end = min(end, self.until)
+        first = np.datetime64(start, "s")
+        last = np.datetime64(end, "s")
+
+        result = []
+        month = datetime.datetime(start.year, start.month, 1)
+        while month < end:
+            columns = self.month_columns(_month_key(month))
+            if columns is not None:
+                times, states = columns
+                low = times.searchsorted(first)
+                high = times.searchsorted(last)
+                if low < high:
+                    result.append((times[low:high], states[low:high]))
+            month = _next_month(month)
+        return result
+
+    def read(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> list[RainbirdData]:
+        data = []
+        for times, states in self.columns(start, end):
+            for time, state in zip(times.tolist(), states.tolist()):
+                zones, rain_sensor = _STATES[state]
+                data.append(RainbirdData(time.date(), time.time(), zones, rain_sensor))
+        return data
+
+
+_archives: dict[str, tuple[float, MonthArchive]] = {}
+_archives_lock = threading.Lock()
+
+
+def open_archive(filepath: str) -> MonthArchive | None:
+    """The archive of a database, None if it has none.
+
+    Archives are cached and reopened when the archiver rewrites the index.
+    """
+    index = os.path.join(archive_dir(filepath), INDEX_FILE)
+    try:
+        mtime = os.stat(index).st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _archives_lock:
+        cached = _archives.get(filepath)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, MonthArchive(archive_dir(filepath)))
+            _archives[filepath] = cached
+        return cached[1]
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        write(file)
+    os.replace(tmp_path, path)
+
+
+def archive_months(
+    filename: str,
+    until: datetime.datetime | None = None,
+    prune: bool = False,
+    rebuild: bool = False,
+) -> list[str]:
+    """Archive all months before until, by default before the current month.
+
+    Only rows after the end of the archive are read, unless rebuild or prune is
+    set. A pruned database only keeps rows before the end of the archive that
+    were written after it was archived, so prune reads them as well and they
+    are merged in instead of being deleted unarchived. Rows of a month that is
+    already archived are merged into its file. Only rows that were read are
+    deleted. Returns the months that were written.
+    """
+    filepath = os.path.join(os.getcwd(), filename)
+    directory = archive_dir(filepath)
+    if until is None:
+        until = datetime.datetime.combine(
+            datetime.date.today().replace(day=1), datetime.time()
+        )
+
+    archive = open_archive(filepath)
+    months = {} if archive is None else dict(archive.months)
+    since = None if archive is None or rebuild or prune else archive.until
+    if archive is not None:
+        until = max(until, archive.until)
+
+    written = []
+    conn = None
+    try:
+        conn = sqlite3.connect(filepath, detect_types=sqlite3.PARSE_DECLTYPES)
+        c = conn.cursor()
+        c.execute(
+            "SELECT * FROM rainbird_data WHERE datetime >= ? AND datetime < ? "
+            "ORDER BY datetime",
+            (since or datetime.datetime.min, until),
+        )
+        os.makedirs(directory, exist_ok=True)
+
+        # rows are ordered, so only one month is in memory at a time
+        for month, rows in itertools.groupby(c, key=lambda row: _month_key(row[0])):
+            file = month + ".npy"
+            _write_month(os.path.join(directory, file), list(rows), month in months)
+            months[month] = {"file": file}
+            written.append(month)
+
+        index = {"until": until.isoformat(), "months": months}
+        _write_atomic(
+            os.path.join(directory, INDEX_FILE),
+            lambda f: f.write(json.dumps(index, indent=2, sort_keys=True).encode()),
+        )
+
+        if prune:
+            c.execute(
+                "DELETE FROM rainbird_data WHERE datetime >= ? AND datetime < ?",
+                (since or datetime.datetime.min, until),
+            )
+            conn.commit()
+
+    except sqlite3.Error as e:
+        print("sqlite3:", e)
+    finally:
+        if conn:
+            conn.close()
+
+    return written
+
+
+def _write_month(path: str, rows: list[tuple], merge: bool) -> None:
+    np = _numpy()
+    array = np.empty(len(rows), dtype=[("time", "datetime64[s]"), ("state", "<u2")])
+    array["time"] = [row[0] for row in rows]
+    array["state"] = [
+        sum(1 << bit for bit, value in enumerate(row[1:10]) if value) for row in rows
+    ]
+
+    if merge and os.path.exists(path):
+        # rows from the database win over archived rows with the same time
+        array = np.concatenate([array, np.load(path)])
+        _, first = np.unique(array["time"], return_index=True)
+        array = array[first]
+
+    _write_atomic(path, lambda file: np.save(file, array))
+
+
+def main() -> None:
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    database = args[0] if args else os.getenv("DATABASE_PATH", "rainbird.sqlite3")
+    months = archive_months(
+        database, prune="--prune" in sys.argv, rebuild="--rebuild" in sys.argv
+    )
+    print(f"Archived {len(months)} months: {', '.join(months)}")
+
+
+if __name__ == "__main__":
+    main()
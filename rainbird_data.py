@@ -1,5 +1,6 @@
 from datetime import datetime
 from pyrainbird import async_client
+from request_profiler import span
 
 
 class RainbirdData:
@@ -28,17 +29,23 @@ class RainbirdData:
         return datetime.fromisoformat(self.timestampString)
 
 
+async def _call(method):
+    """Call a controller method, recorded as a span when the request is profiled."""
+    with span("controller." + method.__name__):
+        return await method()
+
+
 async def get_rainbird_data(
     controller: async_client.AsyncRainbirdController,
 ) -> RainbirdData:
-    date = await controller.get_current_date()
-    time = await controller.get_current_time()
+    date = await _call(controller.get_current_date)
+    time = await _call(controller.get_current_time)
 
-    zones = await controller.get_available_stations()
-    states = await controller.get_zone_states()
+    zones = await _call(controller.get_available_stations)
+    states = await _call(controller.get_zone_states)
     zones_running = [states.active(zone) for zone in zones.active_set]
 
-    rain_sensor_state = await controller.get_rain_sensor_state()
+    rain_sensor_state = await _call(controller.get_rain_sensor_state)
 
     data = RainbirdData(
         date=str(date),
@@ -1,7 +1,6 @@
-from matplotlib import pyplot as plt
-import matplotlib.dates as mdates
 from rainbird_data import RainbirdData
-import os, datetime
+from database_functions import day_range, month_range, get_data_between, get_gaps
+import bisect, io, os, datetime
 
 ACTIVE_ZONES = 3
 COLORS = [
@@ -15,22 +14,187 @@ COLORS = [
     "gray",
 ]
 COLOR_RAIN_SENSOR = "darkgrey"
+COLOR_GAP = "lightgrey"
 ZONE_ALIAS = {
     2: "Glashaus",
 }
 
 
+# dpi: resolution of the default 6.4 x 4.8 inch figure
+# colors: quantize to a palette PNG with that many colors, None keeps full RGB
+# simplify: draw only the first and last sample of every run of equal states
+RENDER_PROFILES = {
+    # Telegram shows photos at most 1280 px wide and re-encodes them anyway
+    "telegram": {"dpi": 200, "colors": 32, "simplify": True},
+    # matplotlib's defaults, as the charts were always rendered
+    "archive": {"dpi": 300, "colors": None, "simplify": False},
+}
+
+
+def _matplotlib():
+    """Import matplotlib on first use, it makes up most of the bot's startup time."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib import pyplot as plt
+    import matplotlib.dates as mdates
+
+    return plt, mdates
+
+
 def render_history_data_day(
     history_data_today: list[RainbirdData],
     filename: str = "tmp/img.png",
     day_offset: int = 0,
+    profile: str = "archive",
+    gaps: list[tuple[datetime.datetime, datetime.datetime]] | None = None,
 ) -> None:
-    """Render history data."""
-    fmt = mdates.DateFormatter("%H:%M")
+    """Render history data, periods without data (gaps) are shaded."""
+    fig, axs = _new_figure("day")
+    _draw_day(
+        fig,
+        axs,
+        history_data_today,
+        day_offset,
+        gaps or [],
+        RENDER_PROFILES[profile]["simplify"],
+    )
+
+    if not os.path.exists("tmp"):
+        os.makedirs("tmp")
 
-    # two line subplots, top one for zones, bottom one for rain sensor
+    _save_figure(fig, filename, profile)
+
+
+def render_history_data_month(
+    history_data_month: list[RainbirdData],
+    filename: str = "tmp/img.png",
+    month_offset: int = 0,
+    profile: str = "archive",
+    gaps: list[tuple[datetime.datetime, datetime.datetime]] | None = None,
+) -> None:
+    """Render history data, periods without data (gaps) are shaded."""
+    if len(history_data_month) < 1:
+        print("No data available for this month.")
+        return
+
+    fig, axs = _new_figure("month")
+    _draw_month(fig, axs, history_data_month, gaps or [])
+
+    if not os.path.exists("tmp"):
+        os.makedirs("tmp")
+
+    _save_figure(fig, filename, profile)
+
+
+def render_charts(
+    database: str, charts: list[tuple[str, int, str]], profile: str = "archive"
+) -> list[str | None]:
+    """Render several charts, given as (kind, offset, filename), in one batch.
+
+    kind is "day" or "month". The union of the chart ranges is read with one
+    query and sliced per chart, and each kind is drawn on one figure that is
+    cleared between charts instead of being set up again. Returns the filename
+    of every chart, None for charts without data.
+    """
+    ranges = [
+        day_range(offset) if kind == "day" else month_range(offset)
+        for kind, offset, _ in charts
+    ]
+    start = min(chart_start for chart_start, _ in ranges)
+    end = max(chart_end for _, chart_end in ranges)
+    data = get_data_between(database, start, end)
+    gaps = get_gaps(database, start, end)
+    times = [entry.datetime for entry in data]
+
+    plt, _ = _matplotlib()
+    figures = {}
+    filenames = []
+    try:
+        for (kind, offset, filename), (chart_start, chart_end) in zip(charts, ranges):
+            chart_data = data[
+                bisect.bisect_left(times, chart_start) : bisect.bisect_left(
+                    times, chart_end
+                )
+            ]
+            if len(chart_data) == 0:
+                filenames.append(None)
+                continue
+
+            chart_gaps = [
+                (max(gap_start, chart_start), min(gap_end, chart_end))
+                for gap_start, gap_end in gaps
+                if gap_start < chart_end and gap_end > chart_start
+            ]
+            if kind in figures:
+                _clear_figure(*figures[kind])
+            else:
+                figures[kind] = _new_figure(kind)
+            fig, axs = figures[kind]
+
+            if kind == "day":
+                _draw_day(
+                    fig,
+                    axs,
+                    chart_data,
+                    offset,
+                    chart_gaps,
+                    RENDER_PROFILES[profile]["simplify"],
+                )
+            else:
+                _draw_month(fig, axs, chart_data, chart_gaps)
+            _save_figure(fig, filename, profile, close=False)
+            filenames.append(filename)
+    finally:
+        for fig, _ in figures.values():
+            plt.close(fig)
+
+    return filenames
+
+
+def _new_figure(kind: str):
+    """Figure with the axes of a day or month chart, without any data."""
+    plt, mdates = _matplotlib()
+
+    # two subplots, top one for zones, bottom one for rain sensor
     fig, axs = plt.subplots(2)
 
+    for ax in axs:
+        ax.set_yticks([0, 1])
+        ax.set_yticklabels(["Off", "On"])
+        # fixed, autoscaling would drop "On" on a day where nothing was on
+        ax.set_ylim(-0.05, 1.05)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter(""))  # hide x-axis labels
+        if kind == "month":
+            ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
+        ax.grid(True)
+
+    axs[1].xaxis.set_major_formatter(
+        mdates.DateFormatter("%H:%M" if kind == "day" else "%d")
+    )
+    axs[1].set_xlabel("Time")
+    return fig, axs
+
+
+def _clear_figure(fig, axs) -> None:
+    """Remove the data of the last chart, the axes setup is kept."""
+    for ax in axs:
+        for artist in [*ax.lines, *ax.collections, *ax.patches]:
+            artist.remove()
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+        # the limits are taken from the next chart's data only
+        ax.ignore_existing_data_limits = True
+
+
+def _draw_day(
+    fig,
+    axs,
+    history_data_today: list[RainbirdData],
+    day_offset: int,
+    gaps: list[tuple[datetime.datetime, datetime.datetime]],
+    simplify: bool = False,
+) -> None:
     fig.suptitle(
         _day_offset_to_string(day_offset)
         + " - "
@@ -39,81 +203,67 @@ def render_history_data_day(
     )
 
     times = [entry.datetime for entry in history_data_today]
+    rain_sensor = [entry.rain_sensor for entry in history_data_today]
 
     # zones subplot
     zones = [entry.zones for entry in history_data_today]
     zones = list(zip(*zones))
 
+    # a NaN at the start of every gap, so the lines are not drawn across it
+    for gap_start, _ in reversed(gaps):
+        position = bisect.bisect_right(times, gap_start)
+        if 0 < position < len(times):
+            times.insert(position, gap_start)
+            rain_sensor.insert(position, float("nan"))
+            zones = [
+                zone[:position] + (float("nan"),) + zone[position:] for zone in zones
+            ]
+
+    def line(values):
+        return _run_boundaries(times, values) if simplify else (times, values)
+
     for index, zone in enumerate(zones):
         if index >= ACTIVE_ZONES:
             break
         if index + 1 in ZONE_ALIAS.keys():
             axs[0].plot(
-                times,
-                zone,
+                *line(zone),
                 label=f"Zone {index+1} - {ZONE_ALIAS[index+1]}",
                 color=COLORS[index],
             )
         else:
-            axs[0].plot(times, zone, label=f"Zone {index+1}", color=COLORS[index])
+            axs[0].plot(*line(zone), label=f"Zone {index+1}", color=COLORS[index])
 
     axs[0].legend(loc="upper right")
 
-    for i, ax in enumerate(axs):
-        axs[i].set_yticks([0, 1])
-        axs[i].set_yticklabels(["Off", "On"])
-        axs[i].xaxis.set_major_formatter(mdates.DateFormatter(""))  # hide x-axis labels
-        axs[i].grid(True)
-
-    rain_sensor = [entry.rain_sensor for entry in history_data_today]
-    axs[1].plot(times, rain_sensor, label="Rain Sensor", color=COLOR_RAIN_SENSOR)
-
-    axs[1].xaxis.set_major_formatter(fmt)
-    axs[1].set_xlabel("Time")
-
-    if not os.path.exists("tmp"):
-        os.makedirs("tmp")
+    axs[1].plot(*line(rain_sensor), label="Rain Sensor", color=COLOR_RAIN_SENSOR)
+    _shade_gaps(axs, gaps)
 
-    plt.savefig(filename, dpi=300)
 
-
-def render_history_data_month(
+def _draw_month(
+    fig,
+    axs,
     history_data_month: list[RainbirdData],
-    filename: str = "tmp/img.png",
-    month_offset: int = 0,
+    gaps: list[tuple[datetime.datetime, datetime.datetime]],
 ) -> None:
-    """Render history data."""
-    fmt = mdates.DateFormatter("%d")
-
-    fig, axs = plt.subplots(2)
-
-    if len(history_data_month) < 1:
-        print("No data available for this month.")
-        return
-
-    month = (history_data_month[0].datetime.month + month_offset) % 12
-    year = (
-        history_data_month[0].datetime.year
-        + (history_data_month[0].datetime.month + month_offset) // 12
-    )
-
-    fig.suptitle(int_to_month(month) + " " + str(year), fontsize=20)
+    # the data already belongs to the month of the chart
+    first = history_data_month[0].datetime
+    fig.suptitle(int_to_month(first.month) + " " + str(first.year), fontsize=20)
 
     zones = {}
     rain_sensor = {}
     for entry in history_data_month:
-        if entry.datetime.date() not in zones:
-            zones[entry.datetime.date()] = [0] * 8
-            rain_sensor[entry.datetime.date()] = False
+        # entry.datetime parses the timestamp on every access
+        day = entry.datetime.date()
+        if day not in zones:
+            zones[day] = [0] * 8
+            rain_sensor[day] = False
 
         for index_zone, zone in enumerate(entry.zones):
-            zones[entry.datetime.date()][index_zone] = (
-                zone and not entry.rain_sensor
-            ) or zones[entry.datetime.date()][index_zone]
-
-            rain_sensor[entry.datetime.date()] = (
-                rain_sensor[entry.datetime.date()] or entry.rain_sensor
-            )
+            if zone and not entry.rain_sensor:
+                zones[day][index_zone] = True
+        if entry.rain_sensor:
+            rain_sensor[day] = True
 
     times = list(zones.keys())
     zones = [zones[time] for time in times]
@@ -142,24 +292,63 @@ def render_history_data_month(
 
     axs[0].legend(loc="upper right")
 
-    for i, ax in enumerate(axs):
-        axs[i].set_yticks([0, 1])
-        axs[i].set_yticklabels(["Off", "On"])
-        axs[i].xaxis.set_major_formatter(mdates.DateFormatter(""))  # hide x-axis labels
-        axs[i].xaxis.set_major_locator(mdates.DayLocator(interval=1))
-        axs[i].grid(True)
-
     rain_sensor = [rain_sensor[time] for time in times]
     axs[1].scatter(times, rain_sensor, label="Rain Sensor", color=COLOR_RAIN_SENSOR)
+    _shade_gaps(axs, gaps)
+
+
+def _run_boundaries(times: list, values: list) -> tuple[list, list]:
+    """Keep only the first and last point of every run of equal values.
+
+    The states only change between on and off, so a line through the kept
+    points is the same as through all of them, with a few points instead of
+    one per poll. NaN never equals anything and is always kept.
+    """
+    last = len(values) - 1
+    kept = [
+        index
+        for index, value in enumerate(values)
+        if index in (0, last)
+        or value != values[index - 1]
+        or value != values[index + 1]
+    ]
+    return [times[index] for index in kept], [values[index] for index in kept]
 
-    axs[1].xaxis.set_major_locator(mdates.DayLocator(interval=1))
-    axs[1].xaxis.set_major_formatter(fmt)
-    axs[1].set_xlabel("Time")
 
-    if not os.path.exists("tmp"):
-        os.makedirs("tmp")
+def _shade_gaps(axs, gaps: list[tuple[datetime.datetime, datetime.datetime]]) -> None:
+    for ax in axs:
+        for gap_start, gap_end in gaps:
+            ax.axvspan(gap_start, gap_end, color=COLOR_GAP, alpha=0.5, linewidth=0)
+
+
+def _save_figure(fig, filename: str, profile: str, close: bool = True) -> None:
+    """Save a figure with the settings of a render profile and close it.
 
-    plt.savefig(filename, dpi=300)
+    pyplot keeps every figure alive until it is closed, so a long running bot
+    would otherwise leak one figure per chart. Batches keep it open to reuse it.
+    """
+    plt, _ = _matplotlib()
+    settings = RENDER_PROFILES[profile]
+
+    try:
+        if settings["colors"] is None:
+            fig.savefig(filename, dpi=settings["dpi"])
+            return
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, dpi=settings["dpi"], format="png")
+    finally:
+        if close:
+            plt.close(fig)
+
+    from PIL import Image
+
+    buffer.seek(0)
+    with Image.open(buffer) as image:
+        palette_image = image.convert("RGB").quantize(
+            colors=settings["colors"], method=Image.Quantize.FASTOCTREE
+        )
+        palette_image.save(filename, format="PNG", optimize=True)
 
 
 def int_to_month(month: int) -> str:
@@ -194,18 +383,14 @@ def _day_offset_to_string(day_offset: int) -> str:
 
 
 if __name__ == "__main__":
-    import database_functions
-
-    render_history_data_day(
-        database_functions.get_data_from_day("rainbird.sqlite3"), "tmp/img_today.png"
-    )
-
-    render_history_data_day(
-        database_functions.get_data_from_day("rainbird.sqlite3", -1),
-        "tmp/img_yesterday.png",
-        -1,
-    )
+    if not os.path.exists("tmp"):
+        os.makedirs("tmp")
 
-    render_history_data_month(
-        database_functions.get_data_from_month("rainbird.sqlite3"), "tmp/img_month.png"
+    render_charts(
+        "rainbird.sqlite3",
+        [
+            ("day", 0, "tmp/img_today.png"),
+            ("day", -1, "tmp/img_yesterday.png"),
+            ("month", 0, "tmp/img_month.png"),
+        ],
     )
@@ -0,0 +1,160 @@
+"""
+Opt-in per-request profiling for the bot.
+
+Handlers wrapped with profile_handler record a tree of spans (controller
+calls, SQL queries with their row counts, data shaping, rendering, upload)
+while profiling is enabled. Requests slower than PROFILE_SLOW_MS are written
+to PROFILE_DIR as JSON, together with a cProfile dump if that is enabled.
+
+When profiling is off, span() only does a context variable lookup.
+
+Environment:
+    PROFILE_REQUESTS  1 to profile from startup, can be toggled with /profile
+    PROFILE_CPROFILE  1 to also run cProfile for profiled requests
+    PROFILE_SLOW_MS   dump requests slower than this (default 1000)
+    PROFILE_DIR       where dumps are written (default tmp/profiles)
+"""
+
+import contextlib, contextvars, cProfile, datetime, functools, json, os, time
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "tmp/profiles")
+
+
+class ProfilerSettings:
+    def __init__(self):
+        self.enabled = os.getenv("PROFILE_REQUESTS", "0") == "1"
+        self.cprofile = os.getenv("PROFILE_CPROFILE", "0") == "1"
+        self.slow_ms = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+        self.last_dump: str | None = None
+
+
+settings = ProfilerSettings()
+
+
+class Span:
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.children: list[Span] = []
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self, origin: float | None = None) -> dict:
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            **({"attributes": self.attributes} if self.attributes else {}),
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+# only one cProfile can be active per interpreter
+_cprofile_active = False
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """Record a child span of the current request, yields None if not profiling.
+
+    Attributes can be added later through the yielded span, e.g. row counts.
+    Context variables are copied into asyncio.to_thread, so spans opened in
+    worker threads end up in the right request.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def set_attribute(name: str, value) -> None:
+    """Add an attribute to the current span, if profiling."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes[name] = value
+
+
+def profile_handler(handler):
+    """Wrap a handler or job so its execution is profiled while enabled."""
+
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        if not settings.enabled:
+            return await handler(*args, **kwargs)
+
+        global _cprofile_active
+        root = Span(handler.__name__, _request_attributes(args))
+        token = _current_span.set(root)
+        profiler = None
+        if settings.cprofile and not _cprofile_active:
+            # also counts other tasks running on the event loop meanwhile
+            _cprofile_active = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        try:
+            return await handler(*args, **kwargs)
+        finally:
+            root.end = time.perf_counter()
+            _current_span.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                _cprofile_active = False
+            if root.duration_ms >= settings.slow_ms:
+                _dump(root, profiler)
+
+    return wrapper
+
+
+def _request_attributes(args: tuple) -> dict:
+    update = args[0] if args else None
+    attributes = {}
+    message = getattr(update, "message", None)
+    query = getattr(update, "callback_query", None)
+    if message is not None:
+        attributes["chat_id"] = message.chat_id
+        attributes["text"] = message.text
+    elif query is not None:
+        attributes["chat_id"] = query.message.chat_id
+        attributes["data"] = query.data
+    return attributes
+
+
+def _dump(root: Span, profiler: cProfile.Profile | None) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(PROFILE_DIR, f"{timestamp}-{root.name}")
+
+    with open(path + ".json", "w") as file:
+        json.dump(root.to_dict(), file, indent=2, default=str)
+    if profiler is not None:
+        profiler.dump_stats(path + ".pstats")
+    settings.last_dump = path + ".json"
+
+
+def span_tree_string(root: dict, indent: int = 0) -> str:
+    """Readable form of a dumped span tree."""
+    line = f"{'  ' * indent}{root['name']}: {root['duration_ms']:.1f} ms"
+    if "attributes" in root:
+        line += " " + ", ".join(f"{k}={v}" for k, v in root["attributes"].items())
+    return "\n".join(
+        [line] + [span_tree_string(child, indent + 1) for child in root["children"]]
+    )
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+DONE = "done"
+DUPLICATE = "duplicate"
+BUSY = "busy"
+
+
+class RequestScheduler:
+    """Admission control for expensive bot requests like charts and statistics.
+
+    A request that is identical to one still running for the same chat is
+    dropped, at most max_running requests run at once and max_waiting wait for
+    a free slot. Anything beyond that is rejected right away, so the queue and
+    with it the response time stay bounded.
+    """
+
+    def __init__(self, max_running: int = 2, max_waiting: int = 8):
+        self.max_waiting = max_waiting
+        self.waiting = 0
+        self.rejected = 0
+        self.deduplicated = 0
+        self._slots = asyncio.Semaphore(max_running)
+        self._in_flight: set[Hashable] = set()
+
+    async def run(self, key: Hashable, job: Callable[[], Awaitable[None]]) -> str:
+        """Run job, returns DONE, DUPLICATE or BUSY."""
+        if key in self._in_flight:
+            self.deduplicated += 1
+            return DUPLICATE
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            return BUSY
+
+        self._in_flight.add(key)
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        except asyncio.CancelledError:
+            self.waiting -= 1
+            self._in_flight.discard(key)
+            raise
+
+        self.waiting -= 1
+        try:
+            await job()
+        finally:
+            self._slots.release()
+            self._in_flight.discard(key)
+        return DONE
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._in_flight) - self.waiting,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "deduplicated": self.deduplicated,
+        }
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+"""
+Soak test for the long running bot.
+
+Drives thousands of simulated commands, button presses, polls and chart
+renders through the handlers of main.py against a stand-in controller and a
+fake Telegram bot, on a temporary database. RSS and tracemalloc are sampled
+while it runs. After a fixed warmup the slope of the traced memory is fitted,
+and the run fails if it grows faster than the threshold. RSS is only reported,
+it keeps creeping up with allocator fragmentation even without a leak.
+
+Usage:
+    python soak.py [iterations]
+
+Environment:
+    SOAK_MAX_SLOPE_MB   allowed traced memory growth in MiB per 1000 iterations
+                        after the warmup (default 2)
+    SOAK_WARMUP         iterations before memory is compared (default 300, at
+                        most half of the run)
+    SOAK_POLL_EVERY     simulated poll every n iterations (default 20)
+"""
+
+import asyncio, datetime, gc, logging, os, random, sys, tempfile, tracemalloc
+
+SOAK_ITERATIONS = 2000
+# every poll adds a sample to the cached ranges, so traced memory grows slowly
+# (about 1 MiB per 1000 iterations) even without a leak
+SOAK_MAX_SLOPE_MB = float(os.getenv("SOAK_MAX_SLOPE_MB", "2"))
+SOAK_WARMUP = int(os.getenv("SOAK_WARMUP", "300"))
+SOAK_POLL_EVERY = int(os.getenv("SOAK_POLL_EVERY", "20"))
+SAMPLE_EVERY = 100
+ADMIN_CHAT_ID = 1
+
+
+class _Namespace:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeController:
+    """Stand-in for AsyncRainbirdController, driven by a simulated clock."""
+
+    clock = datetime.datetime.now()
+    step = datetime.timedelta(minutes=1)
+    # seconds every call takes, like the round trip to the real controller
+    delay = 0.0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def _respond(self, value):
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+        return value
+
+    async def get_current_date(self) -> datetime.date:
+        return await self._respond(FakeController.clock.date())
+
+    async def get_current_time(self) -> datetime.time:
+        return await self._respond(FakeController.clock.time().replace(microsecond=0))
+
+    async def get_available_stations(self):
+        return await self._respond(_Namespace(active_set=set(range(1, 9))))
+
+    async def get_zone_states(self):
+        # zone 1 runs from 6:00 to 6:30, zone 2 from 7:00 to 7:15
+        time = FakeController.clock
+        running = {1} if time.hour == 6 and time.minute < 30 else set()
+        if time.hour == 7 and time.minute < 15:
+            running.add(2)
+        return await self._respond(_Namespace(active=lambda zone: zone in running))
+
+    async def get_rain_sensor_state(self) -> bool:
+        return await self._respond(FakeController.clock.day % 4 == 0)
+
+
+class FakeBot:
+    """Records what the handlers send instead of talking to Telegram."""
+
+    def __init__(self):
+        self.sent = 0
+        self.uploaded = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        self.sent += 1
+        if isinstance(photo, bytes):
+            self.uploaded += 1
+        file_id = f"file-{hash(photo) if isinstance(photo, bytes) else photo}"
+        return _Namespace(photo=[_Namespace(file_id=file_id)])
+
+
+def fake_message(bot: FakeBot, chat_id: int):
+    async def reply_text(text, **kwargs):
+        bot.sent += 1
+
+    async def reply_photo(photo, **kwargs):
+        bot.sent += 1
+
+    return _Namespace(
+        chat_id=chat_id,
+        text="",
+        from_user=_Namespace(username=f"user{chat_id}"),
+        reply_text=reply_text,
+        reply_photo=reply_photo,
+    )
+
+
+def fake_command(bot: FakeBot, chat_id: int, args: list[str]):
+    update = _Namespace(message=fake_message(bot, chat_id), callback_query=None)
+    context = _Namespace(args=args, bot=bot, job=_Namespace(chat_id=chat_id))
+    return update, context
+
+
+def fake_button(bot: FakeBot, chat_id: int, data: str):
+    async def answer(*args, **kwargs):
+        pass
+
+    async def edit_message_text(*args, **kwargs):
+        bot.sent += 1
+
+    query = _Namespace(
+        data=data,
+        message=fake_message(bot, chat_id),
+        answer=answer,
+        edit_message_text=edit_message_text,
+    )
+    update = _Namespace(message=None, callback_query=query)
+    return update, _Namespace(args=[], bot=bot)
+
+
+def slope(points: list[tuple[int, int]]) -> float:
+    """Least squares slope of (x, y) points."""
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def memory_sample() -> tuple[int, int]:
+    from memory_stats import rss_bytes
+
+    gc.collect()
+    return rss_bytes(), tracemalloc.get_traced_memory()[0]
+
+
+async def soak(main, iterations: int) -> bool:
+    bot = FakeBot()
+    commands = [
+        (main.ping, []),
+        (main.help_command, []),
+        (main.check_irrigation_current, []),
+        (main.check_irrigation_today, []),
+        (main.send_history, ["day"]),
+        (main.send_history, ["yesterday"]),
+        (main.send_history, ["day", "-2"]),
+        (main.send_history, ["month"]),
+        (main.send_history, ["month", "-1"]),
+        (main.send_stats, ["week"]),
+        (main.send_stats, ["month", "-1"]),
+        (main.send_memory, []),
+    ]
+    buttons = ["current", "today", "history", "back", "help"] + list(
+        main.HISTORY_BUTTONS
+    )
+
+    random.seed(0)
+    warmup = min(SOAK_WARMUP, iterations // 2)
+    samples = []
+    warmup_snapshot = None
+    for iteration in range(iterations):
+        chat_id = random.randint(1, 20)
+        if iteration % SOAK_POLL_EVERY == 0:
+            FakeController.clock += FakeController.step
+            await main.save_data_to_db(_Namespace(bot=bot))
+        if random.random() < 0.5:
+            handler, args = random.choice(commands)
+            await handler(*fake_command(bot, chat_id, args))
+        else:
+            await main.button_handler(
+                *fake_button(bot, chat_id, random.choice(buttons))
+            )
+
+        if iteration % SAMPLE_EVERY == 0:
+            rss, traced = memory_sample()
+            samples.append((iteration, rss, traced))
+            print(
+                f"{iteration:6d}: RSS {rss / 2**20:7.1f} MiB, "
+                f"traced {traced / 2**20:7.1f} MiB, {bot.sent} sent, "
+                f"{bot.uploaded} uploaded",
+                flush=True,
+            )
+            if warmup_snapshot is None and iteration >= warmup:
+                warmup_snapshot = (len(samples) - 1, tracemalloc.take_snapshot())
+
+    await main.close_controller(None)
+    rss, traced = memory_sample()
+    samples.append((iterations, rss, traced))
+    warmup_index, snapshot = warmup_snapshot or (0, tracemalloc.take_snapshot())
+    after_warmup = samples[warmup_index:]
+    traced_slope = slope([(i, traced) for i, _, traced in after_warmup]) * 1000 / 2**20
+    rss_growth = (rss - after_warmup[0][1]) / 2**20
+
+    print("\nTop allocation growth since warmup:")
+    for statistic in tracemalloc.take_snapshot().compare_to(snapshot, "lineno")[:10]:
+        print(f"    {statistic}")
+
+    print(
+        f"\nRSS growth after warmup: {rss_growth:.1f} MiB\n"
+        f"Traced memory growth after warmup: {traced_slope:.2f} MiB per 1000 "
+        f"iterations (limit {SOAK_MAX_SLOPE_MB:.2f})"
+    )
+    return traced_slope <= SOAK_MAX_SLOPE_MB
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else SOAK_ITERATIONS
+    tmpdir = tempfile.TemporaryDirectory()
+    os.chdir(tmpdir.name)
+    os.environ["DATABASE_PATH"] = "soak.sqlite3"
+    os.environ["TELEGRAM_ADMIN_CHAT_IDS"] = str(ADMIN_CHAT_ID)
+    os.environ.setdefault("DATABASE_INTERVAL_MIN", "1")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from pyrainbird import async_client
+
+    async_client.CreateController = FakeController
+    polls = iterations // SOAK_POLL_EVERY
+    FakeController.clock = datetime.datetime.now() - polls * FakeController.step
+
+    import main as bot_main
+
+    # the handlers log every ping and denied /memory
+    logging.getLogger("main").setLevel(logging.ERROR)
+    bot_main.init_database()
+    tracemalloc.start()
+    passed = asyncio.run(soak(bot_main, iterations))
+    tmpdir.cleanup()
+    if not passed:
+        raise SystemExit("Memory grew beyond the threshold")
+
+
+if __name__ == "__main__":
+    main()
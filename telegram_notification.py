@@ -1,8 +1,18 @@
+import asyncio, collections, time
+import aiohttp
 import requests
 
+TELEGRAM_API_URL = "https://api.telegram.org/bot"
+
+# Telegram allows about 30 messages per second overall and one message per
+# second to the same chat.
+GLOBAL_MESSAGES_PER_SECOND = 30
+CHAT_MESSAGES_PER_SECOND = 1
+MAX_RETRIES = 3
+
 
 def send_notification(message: str, chat_id: str, token: str) -> dict:
-    url: str = "https://api.telegram.org/bot" + token + "/sendMessage"
+    url: str = TELEGRAM_API_URL + token + "/sendMessage"
     data = {
         "chat_id": chat_id,
         "text": message,
@@ -12,5 +22,163 @@ def send_notification(message: str, chat_id: str, token: str) -> dict:
     return response.json()
 
 
+class _RateLimiter:
+    """Spaces out calls so that at most `rate` of them start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Push the next free slot back, e.g. after a 429 response."""
+        self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+class TelegramNotifier:
+    """Async notifier with one pooled HTTP session and a send queue per chat.
+
+    Every chat with pending messages has its own sender task, so a backlog for
+    one chat only waits for that chat's rate limit and never holds up messages
+    to other chats.
+
+    Usage:
+        async with TelegramNotifier(token) as notifier:
+            await notifier.broadcast("Hallo", ["123", "456"])
+    """
+
+    def __init__(
+        self,
+        token: str,
+        connections: int = GLOBAL_MESSAGES_PER_SECOND,
+        global_rate: float = GLOBAL_MESSAGES_PER_SECOND,
+        chat_rate: float = CHAT_MESSAGES_PER_SECOND,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.url = TELEGRAM_API_URL + token + "/sendMessage"
+        self.connections = connections
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+
+        self._global_limiter = _RateLimiter(global_rate)
+        self._chat_limiters: dict[str, _RateLimiter] = {}
+        # pending (message, future) per chat and the task sending them
+        self._chat_queues: dict[str, collections.deque] = {}
+        self._chat_tasks: dict[str, asyncio.Task] = {}
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> "TelegramNotifier":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        if self._session is not None:
+            return
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.connections)
+        )
+
+    async def close(self) -> None:
+        """Wait for queued messages to be sent, then release the session."""
+        if self._session is None:
+            return
+        while self._chat_tasks:
+            await asyncio.gather(*self._chat_tasks.values(), return_exceptions=True)
+        await self._session.close()
+        self._session = None
+
+    async def send(self, message: str, chat_id: str) -> dict:
+        """Queue a message and wait until Telegram answered."""
+        if self._session is None:
+            await self.start()
+        chat_id = str(chat_id)
+        future = asyncio.get_running_loop().create_future()
+        self._chat_queues.setdefault(chat_id, collections.deque()).append(
+            (message, future)
+        )
+        if chat_id not in self._chat_tasks:
+            self._chat_tasks[chat_id] = asyncio.create_task(self._send_chat(chat_id))
+        return await future
+
+    async def broadcast(
+        self, message: str, chat_ids: list[str]
+    ) -> list[dict | Exception]:
+        """Send one message to many chats concurrently.
+
+        A send that failed returns its exception instead of Telegram's answer.
+        """
+        return await asyncio.gather(
+            *(self.send(message, chat_id) for chat_id in chat_ids),
+            return_exceptions=True,
+        )
+
+    def _chat_limiter(self, chat_id: str) -> _RateLimiter:
+        if chat_id not in self._chat_limiters:
+            self._chat_limiters[chat_id] = _RateLimiter(self.chat_rate)
+        return self._chat_limiters[chat_id]
+
+    async def _send_chat(self, chat_id: str) -> None:
+        """Send the messages queued for one chat in order, until none are left."""
+        queue = self._chat_queues[chat_id]
+        try:
+            while queue:
+                message, future = queue.popleft()
+                try:
+                    result = await self._post(chat_id, message)
+                    if not future.done():
+                        future.set_result(result)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+        finally:
+            for _, future in queue:
+                future.cancel()
+            del self._chat_queues[chat_id]
+            del self._chat_tasks[chat_id]
+            # a chat that is idle again does not need its limiter any more
+            limiter = self._chat_limiters.get(chat_id)
+            if limiter is not None and limiter.next_slot <= time.monotonic():
+                del self._chat_limiters[chat_id]
+
+    async def _post(self, chat_id: str, message: str) -> dict:
+        data = {
+            "chat_id": chat_id,
+            "text": message,
+        }
+        chat_limiter = self._chat_limiter(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            # only this chat's task waits here, other chats keep sending
+            await chat_limiter.wait()
+            await self._global_limiter.wait()
+
+            async with self._session.post(self.url, data=data) as response:
+                result = await response.json()
+
+            if response.status != 429 or attempt == self.max_retries:
+                return result
+
+            # Telegram does not say which limit was hit, so back off globally
+            retry_after = result.get("parameters", {}).get("retry_after", 1)
+            self._global_limiter.pause(retry_after)
+            chat_limiter.pause(retry_after)
+
+        return result
+
+
 if __name__ == "__main__":
     send_notification("Hello, world!")
@@ -0,0 +1,4 @@
+import os, sys
+
+# the modules live in the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+import datetime
+import pytest
+from alert_rules import RULES, AlertEngine
+from rainbird_data import RainbirdData
+
+START = datetime.datetime(2024, 6, 1, 6)
+
+
+def sample(minute: int, zones: list[int], rain_sensor: bool = False) -> RainbirdData:
+    time = START + datetime.timedelta(minutes=minute)
+    zones_running = [zone in zones for zone in range(8)]
+    return RainbirdData(time.date(), time.time(), zones_running, rain_sensor)
+
+
+def engine(**kwargs) -> AlertEngine:
+    return AlertEngine(
+        rules=RULES,
+        max_runtime=datetime.timedelta(minutes=30),
+        max_silence=datetime.timedelta(minutes=15),
+        **kwargs,
+    )
+
+
+def test_first_sample_only_sets_the_state():
+    alerts = engine()
+    assert alerts.process(sample(0, [0], rain_sensor=True)) == []
+    assert alerts.process(sample(1, [0], rain_sensor=True)) == []
+
+
+def test_zone_start_stop_and_runtime():
+    alerts = engine()
+    alerts.process(sample(0, []))
+    assert alerts.process(sample(1, [1])) == ["Zone 2 (Glashaus) startet"]
+    assert alerts.process(sample(20, [1])) == []
+    assert alerts.process(sample(31, [1])) == [
+        "Zone 2 (Glashaus) läuft seit 30 min, hängt das Ventil?"
+    ]
+    assert alerts.process(sample(40, [1])) == []
+    assert alerts.process(sample(41, [])) == ["Zone 2 (Glashaus) stoppt nach 40 min"]
+
+
+def test_rain_sensor_changes():
+    alerts = engine()
+    alerts.process(sample(0, []))
+    assert alerts.process(sample(1, [], rain_sensor=True)) == [
+        "Regensensor deaktiviert Bewässerung"
+    ]
+    assert alerts.process(sample(2, [], rain_sensor=False)) == [
+        "Regensensor aktiviert Bewässerung wieder"
+    ]
+
+
+def test_silence_is_reported_once_until_data_arrives():
+    alerts = engine()
+    alerts.process(sample(0, []), received=START)
+    assert alerts.check_silence(START + datetime.timedelta(minutes=10)) == []
+    assert alerts.check_silence(START + datetime.timedelta(minutes=20)) == [
+        "Seit 20 min keine Daten vom Controller"
+    ]
+    assert alerts.check_silence(START + datetime.timedelta(minutes=30)) == []
+    assert alerts.process(sample(31, [])) == ["Controller liefert wieder Daten"]
+
+
+def test_disabled_rules_do_not_alert():
+    alerts = AlertEngine(rules=["zone_runtime"])
+    alerts.process(sample(0, []))
+    assert alerts.process(sample(1, [0], rain_sensor=True)) == []
+
+
+def test_unknown_rules_are_rejected():
+    with pytest.raises(ValueError):
+        AlertEngine(rules=["zone_runtime", "flood"])
@@ -0,0 +1,78 @@
+import datetime, sqlite3
+import pytest
+from database_functions import (
+    MAX_SAMPLE_GAP,
+    add_data,
+    add_data_bulk,
+    coverage,
+    create_sqlite_database,
+    get_data_between,
+    get_gaps,
+)
+from rainbird_data import RainbirdData
+
+DAY = datetime.datetime(2024, 6, 1)
+NEXT_DAY = DAY + datetime.timedelta(days=1)
+STEP = MAX_SAMPLE_GAP / 3
+
+
+def at(steps: float) -> datetime.datetime:
+    return DAY + steps * STEP
+
+
+def sample(time: datetime.datetime) -> RainbirdData:
+    return RainbirdData(time.date(), time.time(), [False] * 8, False)
+
+
+def spans(database: str) -> list[tuple]:
+    with sqlite3.connect(database, detect_types=sqlite3.PARSE_DECLTYPES) as conn:
+        return conn.execute("SELECT * FROM coverage_spans ORDER BY 1").fetchall()
+
+
+def test_samples_merge_into_spans_in_any_order(tmp_path):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    for steps in (0, 1, 10, 11, 5, 3, 4, 2):
+        add_data(database, sample(at(steps)))
+    assert spans(database) == [(at(0), at(5)), (at(10), at(11))]
+
+    add_data(database, sample(at(8)))
+    assert spans(database) == [(at(0), at(11))]
+
+
+def test_gaps_and_coverage(tmp_path):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    for steps in (4, 5, 6, 20, 21):
+        add_data(database, sample(at(steps)))
+
+    end = at(30)
+    gaps = get_gaps(database, DAY, NEXT_DAY, now=end)
+    assert gaps == [(DAY, at(4)), (at(6), at(20)), (at(21), end)]
+    assert coverage(DAY, NEXT_DAY, gaps, now=end) == pytest.approx(1 - 27 / 30)
+
+
+def test_bulk_import_rebuilds_the_spans(tmp_path):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    add_data(database, sample(at(0)))
+    rows = [(at(steps), *[False] * 9) for steps in (1, 2, 9)]
+    assert add_data_bulk(database, rows) == 3
+    assert spans(database) == [(at(0), at(2)), (at(9), at(9))]
+
+
+def test_sample_is_stored_on_a_database_without_coverage_spans(tmp_path):
+    database = str(tmp_path / "rainbird.sqlite3")
+    with sqlite3.connect(database) as conn:
+        conn.execute(
+            "CREATE TABLE rainbird_data (datetime timestamp PRIMARY KEY, "
+            + ", ".join(f"zone_{zone} BOOLEAN" for zone in range(1, 9))
+            + ", rain_sensor BOOLEAN)"
+        )
+    add_data(database, sample(at(0)))
+    assert len(get_data_between(database, DAY, NEXT_DAY, cache=False)) == 1
+
+    # creating the schema later fills the spans from the stored samples
+    create_sqlite_database(database)
+    add_data(database, sample(at(1)))
+    assert spans(database) == [(at(0), at(1))]
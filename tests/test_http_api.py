@@ -0,0 +1,94 @@
+import asyncio, datetime
+from aiohttp.test_utils import TestClient, TestServer
+import database_functions
+from database_functions import add_data, add_data_bulk, create_sqlite_database
+from http_api import create_app
+from rainbird_data import RainbirdData
+from zone_analytics import ZoneIntervalIndex
+
+DAY = datetime.datetime(2024, 6, 1)
+
+
+def sample(minute: int, zones: list[int]) -> RainbirdData:
+    time = DAY + datetime.timedelta(minutes=minute)
+    return RainbirdData(time.date(), time.time(), [z in zones for z in range(8)], False)
+
+
+def request_all(database: str, requests: list[tuple]) -> list:
+    """Send (path, headers[, query]) requests, returns (status, headers, json)."""
+
+    async def zone_index() -> ZoneIntervalIndex:
+        return ZoneIntervalIndex()
+
+    async def run():
+        app = create_app(database, lambda: sample(0, [0]), zone_index)
+        async with TestClient(TestServer(app)) as client:
+            responses = []
+            for path, headers, *query in requests:
+                response = await client.get(
+                    path, headers=headers, params=query[0] if query else None
+                )
+                body = await response.json() if response.status != 304 else None
+                responses.append((response.status, response.headers, body))
+            return responses
+
+    return asyncio.run(run())
+
+
+def test_conditional_requests_get_304_until_the_data_changes(tmp_path, monkeypatch):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    (status, headers, body), = request_all(database, [("/api/current", {})])
+    assert status == 200 and body["zones"][0] is True
+
+    etag = headers["ETag"]
+    (status, headers, _), = request_all(
+        database, [("/api/current", {"If-None-Match": etag})]
+    )
+    assert status == 304
+    assert headers["Vary"] == "Accept-Encoding"
+
+    add_data(database, sample(1, []))
+    (status, headers, _), = request_all(
+        database, [("/api/current", {"If-None-Match": etag})]
+    )
+    assert status == 200
+
+    # e.g. import_history.py, the bot did not write this itself
+    etag = headers["ETag"]
+    with monkeypatch.context() as patch:
+        patch.setattr(database_functions, "_WRITER", "import_history.py")
+        add_data_bulk(database, [(DAY, *[False] * 9)])
+    (status, _, _), = request_all(database, [("/api/current", {"If-None-Match": etag})])
+    assert status == 200
+
+
+def test_offset_aware_times_are_converted_to_local_time(tmp_path):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    add_data(database, sample(30, [0]))
+
+    start = DAY.astimezone(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+    end = (DAY + datetime.timedelta(hours=1)).astimezone().isoformat()
+    query = {"start": start, "end": end}
+    history, stats = request_all(
+        database, [("/api/history", {}, query), ("/api/stats", {}, query)]
+    )
+    assert history[0] == 200
+    assert [entry["time"] for entry in history[2]] == ["2024-06-01T00:30:00"]
+    assert stats[0] == 200
+    assert stats[2]["start"] == DAY.isoformat()
+
+
+def test_invalid_ranges_are_rejected(tmp_path):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    responses = request_all(
+        database,
+        [
+            ("/api/history?start=yesterday", {}),
+            ("/api/history?start=2024-06-02&end=2024-06-01", {}),
+            ("/api/stats?start=9999-12-31", {}),
+        ],
+    )
+    assert [status for status, _, _ in responses] == [400, 400, 400]
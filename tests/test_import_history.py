@@ -0,0 +1,32 @@
+import datetime, io
+from import_history import parse_datetime, read_csv_rows
+
+INSTANT = datetime.datetime(2024, 6, 1, 12, 30, tzinfo=datetime.timezone.utc)
+
+
+def test_aware_timestamps_are_stored_like_unix_timestamps():
+    local = parse_datetime(INSTANT.timestamp())
+    assert parse_datetime("2024-06-01T12:30:00Z") == local
+    assert parse_datetime("2024-06-01T14:30:00+02:00") == local
+    assert parse_datetime(str(int(INSTANT.timestamp()))) == local
+    assert local.tzinfo is None
+
+
+def test_naive_timestamps_are_kept():
+    assert parse_datetime("2024-06-01 12:30") == datetime.datetime(2024, 6, 1, 12, 30)
+
+
+def test_read_csv_rows():
+    file = io.StringIO(
+        "datetime,zone1,zone_3,rain_sensor\n"
+        "2024-06-01 12:30,1,false,yes\n"
+        "2024-06-01 12:31,maybe,0,0\n"
+    )
+    rows = list(read_csv_rows(file))
+    assert rows[0] == (
+        datetime.datetime(2024, 6, 1, 12, 30),
+        True,
+        *[False] * 7,
+        True,
+    )
+    assert isinstance(rows[1], ValueError)
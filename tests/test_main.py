@@ -0,0 +1,76 @@
+import asyncio, datetime, threading
+from types import SimpleNamespace
+import main
+from rainbird_data import RainbirdData
+
+
+class FakeNotifier:
+    def __init__(self):
+        self.broadcasts = []
+
+    async def broadcast(self, message, chat_ids):
+        self.broadcasts.append((message, chat_ids))
+        return [{"ok": True}, RuntimeError("blocked")]
+
+
+def test_alerts_are_broadcast_to_all_subscribed_chats(monkeypatch, caplog):
+    notifier = FakeNotifier()
+    monkeypatch.setattr(main, "notifier", notifier)
+    monkeypatch.setattr(main, "alert_chats", {"2", "1"})
+
+    asyncio.run(main.send_alerts([]))
+    asyncio.run(main.send_alerts(["Zone 1 startet", "Zone 2 startet"]))
+
+    assert notifier.broadcasts == [("Zone 1 startet\nZone 2 startet", ["1", "2"])]
+    assert "Could not send alert to chat 2: blocked" in caplog.text
+
+
+def test_slow_database_reads_do_not_block_other_handlers(monkeypatch):
+    # each read only returns once the other handler reads at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_data_from_day(filename):
+        barrier.wait()
+        return [RainbirdData(datetime.date.today(), datetime.time(), [True] * 8, False)]
+
+    def get_gaps(filename, start, end):
+        barrier.wait()
+        return []
+
+    monkeypatch.setattr(main, "get_data_from_day", get_data_from_day)
+    monkeypatch.setattr(main, "get_gaps", get_gaps)
+
+    replies = []
+
+    async def reply_text(text):
+        replies.append(text)
+
+    update = SimpleNamespace(message=SimpleNamespace(chat_id=1, reply_text=reply_text))
+
+    async def run():
+        await asyncio.gather(
+            main.check_irrigation_today(update, None),
+            main.check_irrigation_today(update, None),
+        )
+
+    asyncio.run(run())
+    assert len(replies) == 2
+    assert "Zone 1 lief heute schon" in replies[0]
+
+
+def test_profile_status_reports_a_missing_dump(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "TELEGRAM_ADMIN_CHAT_IDS", "1")
+    monkeypatch.setattr(main.profiler_settings, "enabled", False)
+    monkeypatch.setattr(
+        main.profiler_settings, "last_dump", str(tmp_path / "deleted.json")
+    )
+    replies = []
+
+    async def reply_text(text):
+        replies.append(text)
+
+    update = SimpleNamespace(message=SimpleNamespace(chat_id=1, reply_text=reply_text))
+    asyncio.run(main.profile_command(update, SimpleNamespace(args=["status"])))
+
+    assert replies[0].startswith("Profiling: off")
+    assert "deleted.json) is missing or unreadable" in replies[0]
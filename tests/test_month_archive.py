@@ -0,0 +1,95 @@
+import datetime, sqlite3
+from database_functions import (
+    add_data_bulk,
+    create_sqlite_database,
+    get_data_between,
+)
+from month_archive import archive_months, open_archive
+
+JANUARY = datetime.datetime(2024, 1, 1)
+FEBRUARY = datetime.datetime(2024, 2, 1)
+MARCH = datetime.datetime(2024, 3, 1)
+APRIL = datetime.datetime(2024, 4, 1)
+
+
+def row(time: datetime.datetime, zone: int | None = None) -> tuple:
+    return (time, *[zone == index for index in range(8)], False)
+
+
+def day(month: datetime.datetime, day: int) -> datetime.datetime:
+    return month.replace(day=day, hour=6)
+
+
+def database_rows(database: str) -> list[datetime.datetime]:
+    with sqlite3.connect(database, detect_types=sqlite3.PARSE_DECLTYPES) as conn:
+        return [time for (time,) in conn.execute("SELECT datetime FROM rainbird_data")]
+
+
+def archived(database: str, start: datetime.datetime, end: datetime.datetime):
+    archive = open_archive(database)
+    return [(entry.datetime, entry.zones) for entry in archive.read(start, end)]
+
+
+def setup(tmp_path) -> str:
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    add_data_bulk(
+        database,
+        [row(day(month, 1), 0) for month in (JANUARY, FEBRUARY, MARCH)]
+        + [row(day(month, 2)) for month in (JANUARY, FEBRUARY, MARCH)],
+    )
+    return database
+
+
+def test_incremental_archiving_only_writes_new_months(tmp_path):
+    database = setup(tmp_path)
+    assert archive_months(database, until=FEBRUARY) == ["2024-01"]
+    assert archive_months(database, until=APRIL) == ["2024-02", "2024-03"]
+    assert open_archive(database).until == APRIL
+
+    data = get_data_between(database, JANUARY, APRIL, cache=False)
+    assert [entry.datetime for entry in data] == sorted(
+        day(month, number) for month in (JANUARY, FEBRUARY, MARCH) for number in (1, 2)
+    )
+    assert data[0].zones[0] and not data[1].zones[0]
+
+
+def test_prune_archives_rows_backfilled_into_an_archived_month(tmp_path):
+    database = setup(tmp_path)
+    archive_months(database, until=MARCH, prune=True)
+    assert database_rows(database) == [day(MARCH, 1), day(MARCH, 2)]
+
+    # e.g. import_history.py into January, which is archived and pruned already
+    add_data_bulk(database, [row(day(JANUARY, 15), 2)])
+    archive_months(database, until=MARCH, prune=True)
+
+    assert database_rows(database) == [day(MARCH, 1), day(MARCH, 2)]
+    assert [time for time, _ in archived(database, JANUARY, FEBRUARY)] == [
+        day(JANUARY, 1),
+        day(JANUARY, 2),
+        day(JANUARY, 15),
+    ]
+
+
+def test_rebuild_merges_backfilled_rows_and_database_rows_win(tmp_path):
+    database = setup(tmp_path)
+    archive_months(database, until=FEBRUARY)
+    add_data_bulk(database, [row(day(JANUARY, 15), 2)])
+    with sqlite3.connect(database) as conn:
+        conn.execute(
+            "UPDATE rainbird_data SET zone_2 = 1 WHERE datetime = ?",
+            (day(JANUARY, 2),),
+        )
+
+    # without rebuild the archived month is not read again
+    assert archive_months(database, until=FEBRUARY) == []
+    assert len(archived(database, JANUARY, FEBRUARY)) == 2
+
+    assert archive_months(database, until=FEBRUARY, rebuild=True) == ["2024-01"]
+    january = archived(database, JANUARY, FEBRUARY)
+    assert [time for time, _ in january] == [
+        day(JANUARY, 1),
+        day(JANUARY, 2),
+        day(JANUARY, 15),
+    ]
+    assert january[1][1][1] and january[2][1][2]
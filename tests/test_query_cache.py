@@ -0,0 +1,104 @@
+import datetime, os
+import database_functions
+from database_functions import (
+    QueryCache,
+    add_data,
+    add_data_bulk,
+    create_sqlite_database,
+    get_data_between,
+)
+from rainbird_data import RainbirdData
+
+DAY = datetime.datetime(2024, 6, 1)
+NEXT_DAY = DAY + datetime.timedelta(days=1)
+
+
+def sample(minute: int) -> RainbirdData:
+    time = DAY + datetime.timedelta(minutes=minute)
+    return RainbirdData(time.date(), time.time(), [False] * 8, False)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = QueryCache(max_rows=3)
+    cache.put(("db", 1, 2), [sample(0)])
+    cache.put(("db", 2, 3), [sample(1), sample(2)])
+    cache.get(("db", 1, 2))
+    cache.put(("db", 3, 4), [sample(3)])
+    assert cache.get(("db", 2, 3)) is None
+    assert len(cache.get(("db", 1, 2))) == 1
+    assert cache.rows == 2
+
+
+def test_invalidate_drops_ranges_containing_the_time():
+    cache = QueryCache()
+    cache.put(("db", DAY, NEXT_DAY), [sample(0)])
+    cache.put(("db", NEXT_DAY, NEXT_DAY + datetime.timedelta(days=1)), [])
+    cache.put(("other", DAY, NEXT_DAY), [])
+    cache.invalidate("db", DAY + datetime.timedelta(hours=1))
+    assert cache.get(("db", DAY, NEXT_DAY)) is None
+    assert cache.get(("db", NEXT_DAY, NEXT_DAY + datetime.timedelta(days=1))) == []
+    assert cache.get(("other", DAY, NEXT_DAY)) == []
+
+
+def test_result_read_before_an_invalidation_is_not_stored():
+    cache = QueryCache()
+    generation = cache.generation
+    cache.invalidate("db", DAY)
+    cache.put(("db", DAY, NEXT_DAY), [sample(0)], generation)
+    assert cache.get(("db", DAY, NEXT_DAY)) is None
+
+    cache.put(("db", DAY, NEXT_DAY), [sample(0)], cache.generation)
+    assert cache.get(("db", DAY, NEXT_DAY)) is not None
+
+
+def test_new_samples_show_up_in_cached_ranges(tmp_path):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    add_data(database, sample(0))
+    assert len(get_data_between(database, DAY, NEXT_DAY)) == 1
+
+    add_data(database, sample(1))
+    assert len(get_data_between(database, DAY, NEXT_DAY)) == 2
+
+
+def write_from_other_process(monkeypatch, write) -> None:
+    with monkeypatch.context() as patch:
+        patch.setattr(database_functions, "_WRITER", "other process")
+        patch.setattr(database_functions, "_data_changed", lambda *args: None)
+        write()
+
+
+def test_writes_of_other_processes_invalidate_cached_ranges(tmp_path, monkeypatch):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    add_data(database, sample(0))
+    other_day = (NEXT_DAY, NEXT_DAY + datetime.timedelta(days=1))
+    assert len(get_data_between(database, DAY, NEXT_DAY)) == 1
+    assert get_data_between(database, *other_day) == []
+
+    changes = []
+    monkeypatch.setattr(
+        database_functions, "_change_listeners", [lambda *args: changes.append(args)]
+    )
+    imported = DAY + datetime.timedelta(hours=1)
+    write_from_other_process(
+        monkeypatch, lambda: add_data_bulk(database, [(imported, *[False] * 9)])
+    )
+    assert len(get_data_between(database, DAY, NEXT_DAY)) == 2
+    assert changes == [(os.path.join(os.getcwd(), database), imported, imported)]
+    # ranges the other process did not touch stay cached
+    hits = database_functions.query_cache.hits
+    get_data_between(database, *other_day)
+    assert database_functions.query_cache.hits == hits + 1
+
+
+def test_readers_behind_the_kept_changes_drop_everything(tmp_path, monkeypatch):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    assert get_data_between(database, DAY, NEXT_DAY) == []
+
+    monkeypatch.setattr(database_functions, "DATA_CHANGES_KEPT", 1)
+    for minute in (1, 2):
+        data = sample(minute)
+        write_from_other_process(monkeypatch, lambda: add_data(database, data))
+    assert len(get_data_between(database, DAY, NEXT_DAY)) == 2
@@ -0,0 +1,149 @@
+import datetime
+import pytest
+from PIL import Image
+import render_history_data
+from database_functions import (
+    add_data_bulk,
+    create_sqlite_database,
+    day_range,
+    get_data_between,
+    get_gaps,
+    month_range,
+)
+from rainbird_data import RainbirdData
+from render_history_data import (
+    _clear_figure,
+    _draw_day,
+    _draw_month,
+    _matplotlib,
+    _new_figure,
+    _run_boundaries,
+    render_charts,
+    render_history_data_day,
+    render_history_data_month,
+)
+
+NAN = float("nan")
+
+
+def test_run_boundaries_keep_the_ends_of_every_run():
+    times = list(range(8))
+    values = [False, False, False, True, True, True, True, False]
+    assert _run_boundaries(times, values) == (
+        [0, 2, 3, 6, 7],
+        [False, False, True, True, False],
+    )
+
+
+def test_run_boundaries_keep_gaps_and_short_series():
+    times, values = _run_boundaries(list(range(5)), [True, True, NAN, True, True])
+    assert times == [0, 1, 2, 3, 4]
+    assert _run_boundaries([0], [True]) == ([0], [True])
+    assert _run_boundaries([], []) == ([], [])
+
+
+def visible_ytick_labels(ax) -> list[str]:
+    low, high = ax.get_ylim()
+    return [
+        label.get_text()
+        for tick, label in zip(ax.get_yticks(), ax.get_yticklabels())
+        if low <= tick <= high
+    ]
+
+
+@pytest.mark.parametrize("kind", ["day", "month"])
+def test_on_and_off_ticks_are_shown_when_nothing_was_on(kind):
+    data = [
+        RainbirdData(datetime.date(2024, 6, day), datetime.time(hour), [0] * 8, False)
+        for day in (1, 2)
+        for hour in range(10)
+    ]
+    fig, axs = _new_figure(kind)
+    try:
+        for _ in range(2):  # the batch renderer clears and reuses the figure
+            _clear_figure(fig, axs)
+            if kind == "day":
+                _draw_day(fig, axs, data, 0, [])
+            else:
+                _draw_month(fig, axs, data, [])
+            fig.canvas.draw()
+            assert [visible_ytick_labels(ax) for ax in axs] == [["Off", "On"]] * 2
+    finally:
+        _matplotlib()[0].close(fig)
+
+
+def write_two_days(database):
+    """Samples every 10 minutes since yesterday, with a gap in the morning."""
+    start = datetime.datetime.combine(
+        datetime.date.today() - datetime.timedelta(days=1), datetime.time()
+    )
+    rows = []
+    time = start
+    while time < datetime.datetime.now():
+        if not start.replace(hour=6) <= time < start.replace(hour=8):
+            zones = [time.hour % 8 == zone and time.minute < 30 for zone in range(8)]
+            rows.append((time, *zones, time.hour >= 20))
+        time += datetime.timedelta(minutes=10)
+    create_sqlite_database(database)
+    add_data_bulk(database, rows)
+
+
+CHARTS = [("day", 0), ("day", -1), ("month", 0)]
+
+
+@pytest.mark.parametrize("profile", ["telegram", "archive"])
+def test_batch_renders_the_same_pixels_as_single_charts(tmp_path, profile):
+    database = str(tmp_path / "rainbird.sqlite3")
+    write_two_days(database)
+
+    batch = render_charts(
+        database,
+        [
+            (kind, offset, str(tmp_path / f"batch_{kind}_{offset}.png"))
+            for kind, offset in CHARTS
+        ],
+        profile,
+    )
+    assert None not in batch
+
+    for (kind, offset), filename in zip(CHARTS, batch):
+        start, end = day_range(offset) if kind == "day" else month_range(offset)
+        data = get_data_between(database, start, end)
+        gaps = get_gaps(database, start, end)
+        single = str(tmp_path / f"single_{kind}_{offset}.png")
+        if kind == "day":
+            render_history_data_day(data, single, offset, profile, gaps)
+        else:
+            render_history_data_month(data, single, offset, profile, gaps)
+
+        with Image.open(filename) as expected, Image.open(single) as actual:
+            assert expected.mode == actual.mode and expected.size == actual.size
+            assert expected.tobytes() == actual.tobytes(), (kind, offset)
+
+
+def test_batch_reads_the_data_once(tmp_path, monkeypatch):
+    database = str(tmp_path / "rainbird.sqlite3")
+    write_two_days(database)
+    calls = []
+
+    def counted(function):
+        def wrapper(*args, **kwargs):
+            calls.append(function.__name__)
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(
+        render_history_data, "get_data_between", counted(get_data_between)
+    )
+    monkeypatch.setattr(render_history_data, "get_gaps", counted(get_gaps))
+
+    render_charts(
+        database,
+        [
+            (kind, offset, str(tmp_path / f"{kind}_{offset}.png"))
+            for kind, offset in CHARTS
+        ],
+        "telegram",
+    )
+    assert sorted(calls) == ["get_data_between", "get_gaps"]
@@ -0,0 +1,61 @@
+import asyncio, json, os, time
+import request_profiler
+from request_profiler import profile_handler, set_attribute, span, span_tree_string
+
+
+@profile_handler
+async def handler(update, context):
+    with span("controller"):
+        await asyncio.sleep(0)
+    with span("query", table="rainbird_data") as query:
+        await asyncio.to_thread(lambda: set_attribute("rows", 3))
+        query.attributes["cached"] = False
+    with span("render"):
+        with span("upload", bytes=10):
+            time.sleep(0.01)
+
+
+def profile(monkeypatch, tmp_path, slow_ms):
+    monkeypatch.setattr(request_profiler, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(request_profiler.settings, "enabled", True)
+    monkeypatch.setattr(request_profiler.settings, "cprofile", False)
+    monkeypatch.setattr(request_profiler.settings, "slow_ms", slow_ms)
+    monkeypatch.setattr(request_profiler.settings, "last_dump", None)
+    asyncio.run(handler(None, None))
+
+
+def test_slow_requests_are_dumped_as_span_tree(monkeypatch, tmp_path):
+    profile(monkeypatch, tmp_path, slow_ms=0)
+
+    with open(request_profiler.settings.last_dump) as file:
+        root = json.load(file)
+    assert root["name"] == "handler"
+    assert [child["name"] for child in root["children"]] == [
+        "controller",
+        "query",
+        "render",
+    ]
+    # attributes set in the worker thread end up in the span of the request
+    query = root["children"][1]
+    assert query["attributes"] == {"table": "rainbird_data", "rows": 3, "cached": False}
+    upload = root["children"][2]["children"][0]
+    assert upload["duration_ms"] >= 10
+    assert upload["start_ms"] >= query["start_ms"]
+
+    lines = span_tree_string(root).splitlines()
+    assert lines[0].startswith("handler: ")
+    assert lines[2].startswith("  query: ") and "rows=3" in lines[2]
+    assert lines[4].startswith("    upload: ") and lines[4].endswith("bytes=10")
+
+
+def test_fast_requests_are_not_dumped(monkeypatch, tmp_path):
+    profile(monkeypatch, tmp_path, slow_ms=60000)
+
+    assert request_profiler.settings.last_dump is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_spans_are_not_recorded_when_profiling_is_off():
+    with span("query") as child:
+        set_attribute("rows", 3)
+    assert child is None
@@ -0,0 +1,55 @@
+import asyncio
+from request_scheduler import BUSY, DONE, DUPLICATE, RequestScheduler
+
+
+def test_identical_requests_are_deduplicated_and_overflow_is_rejected():
+    async def run():
+        scheduler = RequestScheduler(max_running=1, max_waiting=1)
+        release = asyncio.Event()
+        started = []
+
+        def job(name):
+            async def run_job():
+                started.append(name)
+                await release.wait()
+
+            return run_job
+
+        first = asyncio.create_task(scheduler.run("a", job("a")))
+        await asyncio.sleep(0)
+        duplicate = await scheduler.run("a", job("a again"))
+        waiting = asyncio.create_task(scheduler.run("b", job("b")))
+        await asyncio.sleep(0)
+        rejected = await scheduler.run("c", job("c"))
+        stats = scheduler.stats()
+
+        release.set()
+        results = await asyncio.gather(first, waiting)
+        return duplicate, rejected, stats, results, started, scheduler.stats()
+
+    duplicate, rejected, stats, results, started, final_stats = asyncio.run(run())
+    assert duplicate == DUPLICATE
+    assert rejected == BUSY
+    assert stats == {"running": 1, "waiting": 1, "rejected": 1, "deduplicated": 1}
+    assert results == [DONE, DONE]
+    assert started == ["a", "b"]
+    assert final_stats["running"] == 0 and final_stats["waiting"] == 0
+
+
+def test_failing_job_frees_its_slot():
+    async def run():
+        scheduler = RequestScheduler(max_running=1, max_waiting=0)
+
+        async def fail():
+            raise RuntimeError("render failed")
+
+        async def succeed():
+            pass
+
+        try:
+            await scheduler.run("a", fail)
+        except RuntimeError:
+            pass
+        return await scheduler.run("a", succeed)
+
+    assert asyncio.run(run()) == DONE
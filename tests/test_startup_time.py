@@ -0,0 +1,25 @@
+from check_startup_time import (
+    STARTUP_BUDGET_MS,
+    eager_imports,
+    measure_import,
+    parse_importtime,
+)
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        900 | numpy.core
+import time:      2000 |      50000 | main
+"""
+
+
+def test_parse_importtime():
+    times = parse_importtime(IMPORTTIME_OUTPUT)
+    assert times == {"_io": 120, "numpy.core": 900, "main": 50000}
+    assert eager_imports(times) == ["numpy.core"]
+
+
+def test_main_imports_within_budget_without_rendering_stack():
+    times = measure_import("main")
+    assert eager_imports(times) == []
+    assert times["main"] / 1000 <= STARTUP_BUDGET_MS
@@ -0,0 +1,64 @@
+import asyncio, hashlib
+from types import SimpleNamespace
+from telegram.error import BadRequest
+import database_functions, main
+from database_functions import (
+    create_sqlite_database,
+    get_telegram_file_id,
+    set_telegram_file_id,
+)
+
+
+def test_file_ids_are_stored_replaced_and_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_functions, "TELEGRAM_FILES_KEPT", 3)
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+
+    assert get_telegram_file_id(database, "a") is None
+    set_telegram_file_id(database, "a", "file a")
+    set_telegram_file_id(database, "b", "file b")
+    set_telegram_file_id(database, "c", "file c")
+    # uploading a again makes it the newest, so b is evicted first
+    set_telegram_file_id(database, "a", "file a2")
+    set_telegram_file_id(database, "d", "file d")
+
+    assert get_telegram_file_id(database, "a") == "file a2"
+    assert get_telegram_file_id(database, "b") is None
+    assert get_telegram_file_id(database, "c") == "file c"
+    assert get_telegram_file_id(database, "d") == "file d"
+
+    set_telegram_file_id(database, "c", None)
+    assert get_telegram_file_id(database, "c") is None
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_photo(self, chat_id, photo, filename=None):
+        self.sent.append(photo if isinstance(photo, str) else filename)
+        if photo == "expired":
+            raise BadRequest("Wrong file identifier/http url specified")
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f"{len(self.sent)}")])
+
+
+def test_charts_are_sent_by_file_id_and_uploaded_again_if_it_expired(
+    tmp_path, monkeypatch
+):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    monkeypatch.setattr(main, "DATABASE_PATH", database)
+    chart = tmp_path / "chart.png"
+    chart.write_bytes(b"png")
+    bot = FakeBot()
+
+    asyncio.run(main.send_chart(bot, 1, str(chart)))
+    asyncio.run(main.send_chart(bot, 1, str(chart)))
+    assert bot.sent == ["chart.png", "1"]
+
+    # Telegram no longer accepts the stored file_id
+    content_hash = hashlib.sha256(b"png").hexdigest()
+    set_telegram_file_id(database, content_hash, "expired")
+    asyncio.run(main.send_chart(bot, 1, str(chart)))
+    assert bot.sent[2:] == ["expired", "chart.png"]
+    assert get_telegram_file_id(database, content_hash) == "4"
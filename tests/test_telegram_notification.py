@@ -0,0 +1,81 @@
+import asyncio, time
+from telegram_notification import TelegramNotifier
+
+
+class FakeResponse:
+    status = 200
+
+    def __init__(self, data: dict):
+        self.data = data
+
+    async def __aenter__(self) -> "FakeResponse":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def json(self) -> dict:
+        return {"ok": True, "result": self.data}
+
+
+class FakeSession:
+    def __init__(self):
+        self.sent: list[tuple[str, str, float]] = []
+
+    def post(self, url: str, data: dict) -> FakeResponse:
+        self.sent.append((data["chat_id"], data["text"], time.monotonic()))
+        return FakeResponse(data)
+
+    async def close(self) -> None:
+        pass
+
+
+def run_with_fake_session(coroutine_function, **kwargs):
+    async def run():
+        notifier = TelegramNotifier("token", **kwargs)
+        session = FakeSession()
+        notifier._session = session
+        result = await coroutine_function(notifier)
+        await notifier.close()
+        return result, session
+
+    return asyncio.run(run())
+
+
+def test_backlog_of_one_chat_does_not_delay_other_chats():
+    async def send(notifier):
+        started = time.monotonic()
+        backlog = [asyncio.create_task(notifier.send(f"a{i}", "A")) for i in range(10)]
+        await asyncio.sleep(0)
+        await notifier.send("b", "B")
+        other_chat = time.monotonic() - started
+        await asyncio.gather(*backlog)
+        return other_chat, time.monotonic() - started
+
+    (other_chat, backlog), session = run_with_fake_session(
+        send, global_rate=1000, chat_rate=10
+    )
+    assert other_chat < 0.3
+    assert backlog >= 0.8
+    assert [text for chat, text, _ in session.sent if chat == "A"] == [
+        f"a{i}" for i in range(10)
+    ]
+
+
+def test_broadcast_returns_one_answer_per_chat():
+    async def broadcast(notifier):
+        return await notifier.broadcast("Hallo", ["1", "2", "3"])
+
+    results, session = run_with_fake_session(broadcast, global_rate=1000)
+    assert [result["result"]["chat_id"] for result in results] == ["1", "2", "3"]
+    assert len(session.sent) == 3
+
+
+def test_close_waits_for_queued_messages():
+    async def queue(notifier):
+        for i in range(3):
+            asyncio.create_task(notifier.send(str(i), "A"))
+        await asyncio.sleep(0)
+
+    _, session = run_with_fake_session(queue, global_rate=1000, chat_rate=100)
+    assert [text for _, text, _ in session.sent] == ["0", "1", "2"]
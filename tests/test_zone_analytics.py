@@ -0,0 +1,110 @@
+import datetime
+import pytest
+from database_functions import add_data_bulk, create_sqlite_database
+from rainbird_data import RainbirdData
+from zone_analytics import (
+    ZoneIntervalIndex,
+    build_zone_index,
+    parse_stats_range,
+    update_zone_index,
+)
+
+DAY = datetime.datetime(2024, 6, 1)
+
+
+def sample(minute: int, zones: list[int], rain_sensor: bool = False) -> RainbirdData:
+    time = DAY + datetime.timedelta(minutes=minute)
+    zones_running = [zone in zones for zone in range(8)]
+    return RainbirdData(time.date(), time.time(), zones_running, rain_sensor)
+
+
+def at(minute: int) -> datetime.datetime:
+    return DAY + datetime.timedelta(minutes=minute)
+
+
+def build(samples: list[RainbirdData]) -> ZoneIntervalIndex:
+    index = ZoneIntervalIndex(max_gap=datetime.timedelta(minutes=15))
+    for data in samples:
+        index.add_sample(data)
+    return index
+
+
+def test_runs_end_at_the_first_sample_without_the_zone():
+    index = build([sample(0, []), sample(5, [0]), sample(10, [0]), sample(15, [])])
+    assert index.intervals(0, DAY, at(60)) == [(at(5), at(15))]
+    assert index.intervals(1, DAY, at(60)) == []
+
+
+def test_intervals_are_clipped_to_the_range():
+    index = build([sample(0, [0]), sample(10, [0]), sample(20, []), sample(30, [0])])
+    assert index.intervals(0, at(5), at(31)) == [(at(5), at(20)), (at(30), at(30))]
+    assert index.intervals(0, at(21), at(29)) == []
+
+
+def test_run_is_cut_at_a_polling_gap():
+    index = build([sample(0, [0]), sample(10, [0]), sample(60, [0]), sample(70, [])])
+    assert index.intervals(0, DAY, at(120)) == [(at(0), at(10)), (at(60), at(70))]
+
+
+def test_rain_sensor_blocks_runs_and_old_samples_are_ignored():
+    index = build([sample(0, [0], rain_sensor=True), sample(10, []), sample(5, [0])])
+    assert index.intervals(0, DAY, at(60)) == []
+
+
+def test_zone_stats():
+    samples = [sample(0, [0]), sample(10, [])]
+    samples += [sample(minute, [0]) for minute in (20, 30, 40)] + [sample(50, [])]
+    index = build(samples)
+    stats = index.zone_stats(DAY, at(60))[0]
+    assert stats.cycles == 2
+    assert stats.total == datetime.timedelta(minutes=40)
+    assert stats.longest == datetime.timedelta(minutes=30)
+    assert stats.average == datetime.timedelta(minutes=20)
+
+
+def test_parse_stats_range():
+    today = datetime.date(2024, 3, 15)
+    assert parse_stats_range(["month", "-1"], today) == (
+        datetime.datetime(2024, 2, 1),
+        datetime.datetime(2024, 3, 1),
+        "Februar 2024",
+    )
+    assert parse_stats_range(["2024-01-01", "2024-01-02"], today)[:2] == (
+        datetime.datetime(2024, 1, 1),
+        datetime.datetime(2024, 1, 3),
+    )
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["day", "+-5"],
+        ["day", "99999999"],
+        ["year", "9000"],
+        ["month", "-30000"],
+        ["9999-12-31"],
+        ["2024-01-02", "2024-01-01"],
+        ["sometime"],
+    ],
+)
+def test_parse_stats_range_rejects_invalid_ranges(args):
+    assert parse_stats_range(args, datetime.date(2024, 3, 15)) is None
+
+
+def test_update_appends_new_samples_and_rebuilds_for_older_ones(tmp_path):
+    database = str(tmp_path / "rainbird.sqlite3")
+    create_sqlite_database(database)
+    add_data_bulk(database, [(at(0), True, *[False] * 8), (at(5), *[False] * 9)])
+    index = build_zone_index(database)
+
+    add_data_bulk(database, [(at(20), True, *[False] * 8), (at(25), *[False] * 9)])
+    assert update_zone_index(index, database, at(20)) is index
+    assert index.intervals(0, DAY, at(60)) == [(at(0), at(5)), (at(20), at(25))]
+
+    add_data_bulk(database, [(at(10), True, *[False] * 8), (at(15), *[False] * 9)])
+    index = update_zone_index(index, database, at(10))
+    assert index.intervals(0, DAY, at(60)) == [
+        (at(0), at(5)),
+        (at(10), at(15)),
+        (at(20), at(25)),
+    ]
@@ -1,16 +1,21 @@
-import asyncio, aiohttp, os
+import asyncio, aiohttp, os, signal, sys
 from dotenv import load_dotenv
+
+# database_functions reads the poll interval from the environment when imported
+load_dotenv()
+
 from pyrainbird import async_client
+from pyrainbird.exceptions import RainbirdApiException
 from rainbird_data import RainbirdData, get_rainbird_data
 
-from database_functions import create_sqlite_database, add_data
+from database_functions import create_sqlite_database, add_data, connect_database
 from telegram_notification import send_notification
 
-load_dotenv()
-
 RAINBIRD_PASSWORD = os.getenv("RAINBIRD_PASSWORD")
 RAINBIRD_IP = os.getenv("RAINBIRD_IP_ADDRESS")
 DATABASE_PATH = os.getenv("DATABASE_PATH")
+DATABASE_INTERVAL_SEC = os.getenv("DATABASE_INTERVAL_SEC")
+DATABASE_INTERVAL_MIN = os.getenv("DATABASE_INTERVAL_MIN")
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
@@ -37,11 +42,10 @@ telegram_available = not (
 # )
 
 
-if not os.path.exists(DATABASE_PATH):
+async def save_data() -> None:
+    # idempotent, adds the tables of newer versions to an existing database
     create_sqlite_database(DATABASE_PATH)
 
-
-async def save_data() -> None:
     async with aiohttp.ClientSession() as session:
         controller: async_client.AsyncRainbirdController = (
             async_client.CreateController(session, RAINBIRD_IP, RAINBIRD_PASSWORD)
@@ -51,8 +55,67 @@ async def save_data() -> None:
         add_data(DATABASE_PATH, new_data)
 
 
+def sample_interval() -> float:
+    """Seconds between two samples in daemon mode."""
+    if DATABASE_INTERVAL_SEC is not None:
+        return float(DATABASE_INTERVAL_SEC)
+    if DATABASE_INTERVAL_MIN is not None:
+        return float(DATABASE_INTERVAL_MIN) * 60
+    return 60.0
+
+
+async def run_daemon(interval: float) -> None:
+    """Sample every interval seconds until SIGINT or SIGTERM.
+
+    One controller session and one database connection are reused for all
+    samples, a failed poll is reported and retried at the next tick.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Sampling every {interval} seconds", flush=True)
+    # idempotent, adds the tables of newer versions to an existing database
+    create_sqlite_database(DATABASE_PATH)
+    conn = connect_database(DATABASE_PATH)
+    try:
+        async with aiohttp.ClientSession() as session:
+            controller: async_client.AsyncRainbirdController = (
+                async_client.CreateController(session, RAINBIRD_IP, RAINBIRD_PASSWORD)
+            )
+
+            next_sample = loop.time()
+            while not stop.is_set():
+                try:
+                    new_data = await get_rainbird_data(controller)
+                    add_data(DATABASE_PATH, new_data, conn)
+                except (
+                    RainbirdApiException,
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                ) as e:
+                    print("rainbird:", e, flush=True)
+
+                # keep a fixed schedule, skip ticks missed by a slow controller
+                next_sample += interval
+                if next_sample < loop.time():
+                    next_sample = loop.time()
+
+                try:
+                    await asyncio.wait_for(stop.wait(), next_sample - loop.time())
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        conn.close()
+        print("Stopped sampling", flush=True)
+
+
 async def main() -> None:
-    await save_data()
+    if "--daemon" in sys.argv:
+        await run_daemon(sample_interval())
+    else:
+        await save_data()
 
 
 if __name__ == "__main__":
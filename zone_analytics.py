@@ -0,0 +1,223 @@
+import bisect, datetime
+from rainbird_data import RainbirdData
+from database_functions import MAX_SAMPLE_GAP, get_data_between
+from render_history_data import ACTIVE_ZONES, ZONE_ALIAS, int_to_month
+
+ZONE_COUNT = 8
+
+
+class ZoneStats:
+    def __init__(self, intervals: list[tuple[datetime.datetime, datetime.datetime]]):
+        durations = [end - start for start, end in intervals]
+        self.cycles = len(durations)
+        self.total = sum(durations, datetime.timedelta())
+        self.longest = max(durations, default=datetime.timedelta())
+
+    @property
+    def average(self) -> datetime.timedelta:
+        if self.cycles == 0:
+            return datetime.timedelta()
+        return self.total / self.cycles
+
+
+class ZoneIntervalIndex:
+    """Run intervals of every zone, sorted by start time.
+
+    The intervals of one zone never overlap, so their ends are sorted as well.
+    A range query is therefore two binary searches plus the k intervals found.
+    """
+
+    def __init__(
+        self, zone_count: int = ZONE_COUNT, max_gap: datetime.timedelta = MAX_SAMPLE_GAP
+    ):
+        # a zone that is still on after a longer polling outage is not counted as running
+        self.max_gap = max_gap
+        self.starts: list[list[datetime.datetime]] = [[] for _ in range(zone_count)]
+        self.ends: list[list[datetime.datetime]] = [[] for _ in range(zone_count)]
+        # start of the interval that is still running, per zone
+        self.running: list[datetime.datetime | None] = [None] * zone_count
+        self.last_sample: datetime.datetime | None = None
+
+    def add_sample(self, data: RainbirdData) -> None:
+        """Add the next sample, older samples than the last one are ignored."""
+        time = data.datetime
+        if self.last_sample is not None and time <= self.last_sample:
+            return
+
+        gap = self.last_sample is not None and time - self.last_sample > self.max_gap
+        for zone, zone_state in enumerate(data.zones[: len(self.running)]):
+            # same rule as the charts: a zone blocked by the rain sensor does not run
+            running = bool(zone_state) and not data.rain_sensor
+            start = self.running[zone]
+
+            if start is not None and (gap or not running):
+                self.starts[zone].append(start)
+                self.ends[zone].append(self.last_sample if gap else time)
+                start = None
+
+            if running and start is None:
+                start = time
+            self.running[zone] = start
+
+        self.last_sample = time
+
+    def intervals(
+        self, zone: int, start: datetime.datetime, end: datetime.datetime
+    ) -> list[tuple[datetime.datetime, datetime.datetime]]:
+        """Run intervals of a zone overlapping [start, end), clipped to the range."""
+        starts, ends = self.starts[zone], self.ends[zone]
+        first = bisect.bisect_right(ends, start)
+        last = bisect.bisect_left(starts, end)
+
+        result = [
+            (max(run_start, start), min(run_end, end))
+            for run_start, run_end in zip(starts[first:last], ends[first:last])
+        ]
+
+        running_since = self.running[zone]
+        if running_since is not None and running_since < end:
+            if self.last_sample >= start:
+                result.append((max(running_since, start), min(self.last_sample, end)))
+
+        return result
+
+    def zone_stats(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> list[ZoneStats]:
+        return [
+            ZoneStats(self.intervals(zone, start, end))
+            for zone in range(len(self.running))
+        ]
+
+
+def build_zone_index(filename: str) -> ZoneIntervalIndex:
+    """Build the interval index from all samples in the database."""
+    index = ZoneIntervalIndex()
+    for entry in get_data_between(
+        filename, datetime.datetime.min, datetime.datetime.max, cache=False
+    ):
+        index.add_sample(entry)
+    return index
+
+
+def update_zone_index(
+    index: ZoneIntervalIndex, filename: str, changed_from: datetime.datetime
+) -> ZoneIntervalIndex:
+    """Bring the index up to date after another process wrote from changed_from on.
+
+    New samples after the indexed ones, e.g. from the daemon, are appended.
+    Changes to indexed time, e.g. an import of history, rebuild the index.
+    """
+    if index.last_sample is None or changed_from <= index.last_sample:
+        return build_zone_index(filename)
+    for entry in get_data_between(
+        filename, index.last_sample, datetime.datetime.max, cache=False
+    ):
+        index.add_sample(entry)
+    return index
+
+
+def parse_stats_range(
+    args: list[str], today: datetime.date
+) -> tuple[datetime.datetime, datetime.datetime, str] | None:
+    """Parse the arguments of /stats into (start, end, label).
+
+    Accepted: today, yesterday, week, day <offset>, month <offset>, year <offset>,
+    <YYYY-MM-DD> and <YYYY-MM-DD> <YYYY-MM-DD> (both days included). Returns None
+    for anything else, including offsets outside of the dates datetime supports.
+    """
+    try:
+        return _parse_stats_range(args, today)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _parse_stats_range(
+    args: list[str], today: datetime.date
+) -> tuple[datetime.datetime, datetime.datetime, str] | None:
+    command = args[0].lower() if len(args) > 0 else "today"
+    offset = args[1] if len(args) > 1 else "0"
+    if command in ("day", "tag", "month", "monat", "year", "jahr"):
+        if not offset.lstrip("+-").isdigit():
+            return None
+        offset = int(offset)
+
+    if command in ("today", "heute"):
+        first_day, last_day, label = today, today, "Heute"
+    elif command in ("yesterday", "gestern"):
+        first_day = last_day = today - datetime.timedelta(days=1)
+        label = "Gestern"
+    elif command in ("week", "woche"):
+        first_day, last_day, label = today - datetime.timedelta(days=6), today, "7 Tage"
+    elif command in ("day", "tag"):
+        first_day = last_day = today + datetime.timedelta(days=offset)
+        label = str(first_day)
+    elif command in ("month", "monat"):
+        month_index = today.year * 12 + today.month - 1 + offset
+        first_day = datetime.date(month_index // 12, month_index % 12 + 1, 1)
+        next_month = month_index + 1
+        last_day = datetime.date(
+            next_month // 12, next_month % 12 + 1, 1
+        ) - datetime.timedelta(days=1)
+        label = int_to_month(first_day.month) + " " + str(first_day.year)
+    elif command in ("year", "jahr"):
+        first_day = datetime.date(today.year + offset, 1, 1)
+        last_day = datetime.date(today.year + offset, 12, 31)
+        label = str(first_day.year)
+    else:
+        try:
+            first_day = datetime.date.fromisoformat(args[0])
+            last_day = (
+                datetime.date.fromisoformat(args[1]) if len(args) > 1 else first_day
+            )
+        except ValueError:
+            return None
+        if last_day < first_day:
+            return None
+        label = str(first_day) if first_day == last_day else f"{first_day} - {last_day}"
+
+    start = datetime.datetime.combine(first_day, datetime.time())
+    end = datetime.datetime.combine(
+        last_day + datetime.timedelta(days=1), datetime.time()
+    )
+    return start, end, label
+
+
+def _format_duration(duration: datetime.timedelta) -> str:
+    minutes = round(duration.total_seconds() / 60)
+    if minutes < 60:
+        return f"{minutes} min"
+    return f"{minutes // 60}:{minutes % 60:02d} h"
+
+
+def zone_stats_string(
+    index: ZoneIntervalIndex,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    label: str,
+    coverage: float = 1.0,
+) -> str:
+    message = f"Statistik {label}\n"
+    if coverage < 1:
+        message += f"Daten für {coverage:.0%} des Zeitraums\n"
+    for zone, stats in enumerate(index.zone_stats(start, end)):
+        if zone >= ACTIVE_ZONES:
+            break
+
+        name = f"Zone {zone+1}"
+        if zone + 1 in ZONE_ALIAS.keys():
+            name += f" - {ZONE_ALIAS[zone+1]}"
+
+        if stats.cycles == 0:
+            message += f"\n{name}: lief nicht\n"
+            continue
+
+        message += (
+            f"\n{name}:\n"
+            f"    Laufzeit: {_format_duration(stats.total)}\n"
+            f"    Zyklen: {stats.cycles}\n"
+            f"    Durchschnitt: {_format_duration(stats.average)}\n"
+            f"    Längster Lauf: {_format_duration(stats.longest)}\n"
+        )
+
+    return message